@@ -0,0 +1,75 @@
+"""
+Micro-benchmark for the listing page parser backends in `scraper.py`.
+
+Save some listing pages first, then time every backend over them:
+    python benchmark_parsers.py pages/ --save https://www.cityelectricsupply.com/nm-b-wire
+    python benchmark_parsers.py pages/ --repeat 20
+"""
+import argparse
+import glob
+import os
+import time
+
+from scraper import PARSERS, HttpClient
+
+
+def save_pages(directory, urls):
+    """Download listing pages (following `.next-page`) into `directory`."""
+    os.makedirs(directory, exist_ok=True)
+    client = HttpClient()
+    for url in urls:
+        next_page = url
+        while next_page:
+            response = client.get(next_page)
+            if response.status_code != 200:
+                print(f"Failed to fetch {next_page}")
+                break
+            name = next_page.split("cityelectricsupply.com/")[-1].replace("/", "_").replace("?", "_").replace("=", "-")
+            with open(os.path.join(directory, name + ".html"), "w", encoding="utf-8") as file:
+                file.write(response.text)
+            _, next_href = PARSERS["bs4"](response.text)
+            next_page = f"https://www.cityelectricsupply.com{next_href}" if next_href else None
+    client.close()
+
+
+def benchmark(directory, repeat):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, encoding="utf-8") as file:
+            pages.append(file.read())
+    if not pages:
+        print(f"No .html files found in {directory}")
+        return
+
+    reference = [PARSERS["bs4"](html) for html in pages]
+    product_count = sum(len(products) for products, _ in reference)
+    print(f"{len(pages)} pages, {product_count} products, {repeat} repeats")
+
+    for name, parse in PARSERS.items():
+        results = [parse(html) for html in pages]
+        matches = results == reference
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for html in pages:
+                parse(html)
+        elapsed = time.perf_counter() - started
+
+        per_page = elapsed / (repeat * len(pages)) * 1000
+        per_product = elapsed / (repeat * max(product_count, 1)) * 1000
+        print(f"{name:>6}: {per_page:8.3f} ms/page  {per_product:7.4f} ms/product  same output as bs4: {matches}")
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Benchmark CES listing page parsers.')
+    parser.add_argument('directory', type=str, help='Directory of saved listing .html pages.')
+    parser.add_argument('--repeat', type=int, default=10, help='Passes over the saved pages per backend.')
+    parser.add_argument('--save', nargs='+', metavar='URL', help='Download these listing URLs into the directory first.')
+    return parser
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    if args.save:
+        save_pages(args.directory, args.save)
+    benchmark(args.directory, args.repeat)
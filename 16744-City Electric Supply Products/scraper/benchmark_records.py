@@ -0,0 +1,89 @@
+"""
+Memory comparison between the old per-product dict and `ProductRecord`.
+
+Builds the same products both ways and reports traced allocations per 10k products:
+    python benchmark_records.py --products 10000 --categories 20
+"""
+import argparse
+import tracemalloc
+
+from scraper import SCRAPE_DATETIME, ProductRecord
+
+
+def product_fields(count, categories):
+    """Yield listing-like fields; strings are built per product as the parser would."""
+    for i in range(count):
+        category = "".join(["Category ", str(i % categories)])
+        base_url = "".join(["https://www.cityelectricsupply.com/category-", str(i % categories)])
+        yield (
+            base_url,
+            category,
+            f"https://www.cityelectricsupply.com/product-{i}-16awg-stranded-tffn-wire-copper-red",
+            f"TFFN-16-STR-RED-CU-{i}, 16AWG, Stranded, TFFN Wire, Copper, Red, 1 Conductor, Reel of 500ft",
+            f"TFFN-16-STR-RED-CU-{i}",
+            f"0041-{i:04d}",
+            "Reel of 500 Feet",
+        )
+
+
+def build_dicts(fields):
+    return [
+        {
+            "scrape_datetime": SCRAPE_DATETIME.isoformat(),
+            "base_url": base_url,
+            "category": category,
+            "product_url": product_url,
+            "product_name": product_name,
+            "catalog_code": catalog_code,
+            "stock_code": stock_code,
+            "availability": "N/A",
+            "buying_option": buying_option,
+            "price": "N/A",
+        }
+        for base_url, category, product_url, product_name, catalog_code, stock_code, buying_option in fields
+    ]
+
+
+def build_records(fields):
+    return [
+        ProductRecord(
+            base_url=base_url,
+            category=category,
+            product_url=product_url,
+            product_name=product_name,
+            catalog_code=catalog_code,
+            stock_code=stock_code,
+            buying_option=buying_option,
+        )
+        for base_url, category, product_url, product_name, catalog_code, stock_code, buying_option in fields
+    ]
+
+
+def measure(build, count, categories):
+    fields = list(product_fields(count, categories))
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    products = build(fields)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # Only count what the build itself allocated; the per-product source strings are shared by both.
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del products
+    return size
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Compare product dict and ProductRecord memory.')
+    parser.add_argument('--products', type=int, default=10000, help='Products to build.')
+    parser.add_argument('--categories', type=int, default=20, help='Distinct base URL/category pairs.')
+    return parser
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    per = 10000 / args.products
+    dict_size = measure(build_dicts, args.products, args.categories)
+    record_size = measure(build_records, args.products, args.categories)
+    print(f"dict:          {dict_size * per / 1024:10.1f} KiB per 10k products")
+    print(f"ProductRecord: {record_size * per / 1024:10.1f} KiB per 10k products")
+    print(f"saving:        {(1 - record_size / dict_size) * 100:10.1f} %")
@@ -0,0 +1,89 @@
+"""
+End-to-end benchmark of the CES scraper against a recorded fixture archive.
+
+Every mode runs offline, either in-process (--replay) or through the local
+stand-in server with simulated latency (default), so runs are comparable:
+    python scraper.py --record fixtures/
+    python benchmark_scraper.py fixtures/ --latency 0.05
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import replay_server
+from scraper import Scraper
+
+MODES = {
+    "sequential": {},
+    "concurrent": {"concurrent": True},
+    "pipeline": {"pipeline": True},
+}
+
+
+def run_mode(mode, fixture_dir, upstream, workdir, options):
+    scraper = Scraper(
+        output_file=os.path.join(workdir, f"{mode}.csv"),
+        collect=False,
+        category_cache_file=os.path.join(workdir, f"{mode}-categories.json"),
+        replay_dir=None if upstream else fixture_dir,
+        upstream=upstream,
+        **MODES[mode],
+        **options,
+    )
+    logging.getLogger().setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    scraper.start_scraper()
+    wall = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "pages": scraper.PAGES,
+        "products": scraper.ROWS_WRITTEN,
+        "requests": scraper.CLIENT.REQUESTS,
+        "parse_s": scraper.PARSE_SECONDS,
+        "wall_s": wall,
+        "pages_per_s": scraper.PAGES / wall if wall else 0.0,
+        "products_per_s": scraper.ROWS_WRITTEN / wall if wall else 0.0,
+    }
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Benchmark CES scraper modes offline.')
+    parser.add_argument('fixture_dir', type=str, help='Directory written by `scraper.py --record`.')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES), help='Modes to run.')
+    parser.add_argument('--replay', action='store_true', help='Replay in-process instead of through the stand-in server.')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stand-in server latency per response in seconds.')
+    parser.add_argument('--parser', choices=["bs4", "lxml"], default=None, help='Parser backend (default: scraper default).')
+    parser.add_argument('--workers', dest='max_workers', type=int, default=None, help='Worker pool size.')
+    parser.add_argument('--chunk-size', type=int, default=None, help='IDs per lazyprice/lazyinventory request.')
+    return parser
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    options = {
+        name: value for name, value in
+        {"parser": args.parser, "max_workers": args.max_workers, "chunk_size": args.chunk_size}.items()
+        if value is not None
+    }
+
+    server = None if args.replay else replay_server.serve(args.fixture_dir, latency=args.latency)
+    upstream = f"http://127.0.0.1:{server.server_port}" if server else None
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in args.modes:
+            results.append(run_mode(mode, args.fixture_dir, upstream, workdir, options))
+
+    if server:
+        server.shutdown()
+
+    print(f"{'mode':<11} {'pages':>6} {'products':>9} {'requests':>9} {'parse s':>8} {'wall s':>8} {'pages/s':>8} {'products/s':>11}")
+    for result in results:
+        print(
+            f"{result['mode']:<11} {result['pages']:>6} {result['products']:>9} {result['requests']:>9} "
+            f"{result['parse_s']:>8.3f} {result['wall_s']:>8.3f} {result['pages_per_s']:>8.1f} {result['products_per_s']:>11.1f}"
+        )
@@ -0,0 +1,69 @@
+"""
+Local stand-in for www.cityelectricsupply.com that serves a recorded fixture archive.
+
+Record an archive, then point the scraper at the stand-in:
+    python scraper.py --record fixtures/
+    python replay_server.py fixtures/ --port 8800 --latency 0.05
+    python scraper.py out.csv --upstream http://127.0.0.1:8800
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scraper import ORIGIN, FixtureArchive
+
+
+def make_handler(fixture_dir, latency):
+    archive = FixtureArchive(fixture_dir)
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, method, json_data=None):
+            time.sleep(latency)
+            status_code, headers, text = archive.load(method, ORIGIN + self.path, json_data)
+
+            body = text.encode("utf-8")
+            self.send_response(status_code)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self.reply("GET")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.reply("POST", json.loads(self.rfile.read(length)) if length else None)
+
+    return ReplayHandler
+
+
+def serve(fixture_dir, port=0, latency=0.0):
+    """Start the stand-in in a background thread and return the server (`server.server_port` is bound)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(fixture_dir, latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Serve a recorded CES fixture archive locally.')
+    parser.add_argument('fixture_dir', type=str, help='Directory written by `scraper.py --record`.')
+    parser.add_argument('--port', type=int, default=8800, help='Port to listen on (default: 8800).')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of simulated latency per response.')
+    return parser
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.fixture_dir, args.latency))
+    print(f"Serving {args.fixture_dir} on http://127.0.0.1:{args.port}")
+    server.serve_forever()
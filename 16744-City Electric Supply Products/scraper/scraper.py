@@ -1,14 +1,32 @@
 import os
 import json
 import csv
+import asyncio
+import argparse
+import hashlib
+from urllib.parse import urlsplit
 from bs4 import BeautifulSoup
 import datetime
 from datetime import datetime, timezone
 import time
 import logging
+import threading
+import sys
 
-import pandas as pd
 from curl_cffi import requests
+from curl_cffi.requests import AsyncSession, Headers
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
 
 BASE_URLS = [
@@ -26,7 +44,16 @@ OUTPUT_FILE = (
 )
 
 OUTPUT_FILE = os.path.join("16744-City Electric Supply Products", JOB_NAME.lower().replace(" ", "-") + "-data.csv")
+STORE_FILE = os.path.join("16744-City Electric Supply Products", "ces-product-store.json")
+DELTA_FILE = OUTPUT_FILE.replace("-data.csv", "-delta.csv")
 SCRAPE_DATETIME = datetime.now(timezone.utc)
+SCRAPE_DATETIME_ISO = sys.intern(SCRAPE_DATETIME.isoformat())
+
+FIELDNAMES = [
+    "scrape_datetime", "base_url", "category", "product_url", "product_name", 
+    "catalog_code", "stock_code", "availability", "buying_option", "price"
+]
+PARQUET_ROW_GROUP = 10000
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -36,9 +63,457 @@ HEADERS = {
     "Content-Type": "application/json"
 }
 
+# Concurrent crawl settings (used when the scraper runs with concurrent=True)
+MAX_WORKERS = 8
+PER_HOST_LIMIT = 4
+IMPERSONATE = "chrome110"
+SUBCATEGORY_SELECTOR = ".sub-category-item a"
+SUB_SUBCATEGORY_SELECTOR = ".category-grid.sub-category-grid .item-box .sub-category-item h2.title a"
+
+# Category tree discovery cache
+CATEGORY_CACHE_FILE = os.path.join("16744-City Electric Supply Products", "ces-category-tree.json")
+CATEGORY_TTL = 7 * 24 * 3600
+MAX_CATEGORY_DEPTH = 3
+REQUEST_TIMEOUT = 60
+
+# Record/replay fixtures: URLs are keyed on this origin even when requests are routed elsewhere
+ORIGIN = "https://www.cityelectricsupply.com"
+FIXTURE_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+def fixture_key(method, url, json_data=None):
+    """Stable archive key for a request: method, canonical URL and JSON body."""
+    body = json.dumps(json_data, sort_keys=True, separators=(",", ":")) if json_data is not None else ""
+    return hashlib.sha1(f"{method.upper()} {url} {body}".encode("utf-8")).hexdigest()
+
+
+class FixtureArchive:
+    """Read side of a recorded fixture directory.
+
+    lazyprice/lazyinventory answers are also indexed per ID, so a replay whose chunks
+    differ from the recording (another --chunk-size, or the pipeline) can still be served.
+    """
+
+    def __init__(self, fixture_dir):
+        self.FIXTURE_DIR = fixture_dir
+        self.ITEMS = None
+        self._lock = threading.Lock()
+
+    def load(self, method, url, json_data=None):
+        """Return `(status_code, headers, text)` for a request; unknown requests get a 404."""
+        path = os.path.join(self.FIXTURE_DIR, fixture_key(method, url, json_data) + ".json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                fixture = json.load(file)
+            return fixture["status_code"], fixture["headers"], fixture["text"]
+
+        if method.upper() == "POST" and url in BATCH_ITEM_KEYS and json_data:
+            payload_key, item_key = BATCH_ITEM_KEYS[url]
+            items = self.batch_items()
+            found = [items[(url, str(i))] for i in json_data.get(payload_key, []) if (url, str(i)) in items]
+            return 200, {"Content-Type": "application/json"}, json.dumps(found)
+
+        logging.warning(f"No fixture for {method} {url}")
+        return 404, {}, ""
+
+    def batch_items(self):
+        """Index every recorded batch response item by `(url, id)` on first use."""
+        with self._lock:
+            if self.ITEMS is None:
+                self.ITEMS = {}
+                for name in sorted(os.listdir(self.FIXTURE_DIR)):
+                    if not name.endswith(".json"):
+                        continue
+                    with open(os.path.join(self.FIXTURE_DIR, name), "r", encoding="utf-8") as file:
+                        fixture = json.load(file)
+                    if fixture["url"] not in BATCH_ITEM_KEYS or fixture["status_code"] != 200:
+                        continue
+                    _, item_key = BATCH_ITEM_KEYS[fixture["url"]]
+                    try:
+                        for item in json.loads(fixture["text"]):
+                            self.ITEMS[(fixture["url"], str(item.get(item_key)))] = item
+                    except (json.JSONDecodeError, AttributeError):
+                        pass
+            return self.ITEMS
+
+
+class ReplayResponse:
+    """Minimal stand-in for a curl_cffi response, served from the fixture archive."""
+
+    def __init__(self, url, status_code, headers, text):
+        self.url = url
+        self.status_code = status_code
+        self.headers = Headers(headers)
+        self.text = text
+        self.content = text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+# lazyprice / lazyinventory batch settings
+PRICE_URL = "https://www.cityelectricsupply.com/product/lazyprice"
+INVENTORY_URL = "https://www.cityelectricsupply.com/product/lazyinventory"
+CHUNK_SIZE = 50
+BATCH_CONCURRENCY = 4
+BATCH_ATTEMPTS = 3
+BATCH_BACKOFF = 2
+BATCH_ITEM_KEYS = {PRICE_URL: ("imsIds", "ImsId"), INVENTORY_URL: ("skus", "Sku")}
+
+
+class ProductRecord:
+    """Slotted in-flight product row.
+
+    The strings every product in a category shares (scrape datetime, base URL, category)
+    are interned, so the records point at one copy instead of carrying their own.
+    """
+
+    __slots__ = tuple(FIELDNAMES)
+
+    def __init__(self, base_url, category, product_url, product_name, catalog_code, stock_code,
+                 buying_option, availability="N/A", price="N/A", scrape_datetime=SCRAPE_DATETIME_ISO):
+        self.scrape_datetime = sys.intern(scrape_datetime)
+        self.base_url = sys.intern(base_url)
+        self.category = sys.intern(category)
+        self.product_url = product_url
+        self.product_name = product_name
+        self.catalog_code = catalog_code
+        self.stock_code = stock_code
+        self.availability = availability
+        self.buying_option = buying_option
+        self.price = price
+
+    def as_row(self):
+        return [getattr(self, name) for name in FIELDNAMES]
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in FIELDNAMES}
+
+
+class RowSink:
+    """Single-pass product writer: rows go to the CSV (and optional Parquet file) as they are produced.
+
+    Parquet rows are buffered only up to one row group, so the catalogue is never held in memory.
+    """
+
+    def __init__(self, csv_file=None, parquet_file=None, fieldnames=FIELDNAMES):
+        self.FIELDNAMES = fieldnames
+        self.ROWS_WRITTEN = 0
+        self.CSV_FILE = csv_file
+        self.PARQUET_FILE = parquet_file
+        self._csv = None
+        self._writer = None
+        self._parquet = None
+        self._buffer = []
+
+        if csv_file:
+            os.makedirs(os.path.dirname(csv_file) or ".", exist_ok=True)
+            self._csv = open(csv_file, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._csv, quotechar='"', quoting=csv.QUOTE_ALL)
+            self._writer.writerow(fieldnames)
+
+        if parquet_file:
+            if pa is None:
+                raise ImportError("pyarrow is required for Parquet output.")
+            os.makedirs(os.path.dirname(parquet_file) or ".", exist_ok=True)
+            schema = pa.schema([(name, pa.string()) for name in fieldnames])
+            self._parquet = pq.ParquetWriter(parquet_file, schema)
+
+    def write(self, row):
+        """Write a `ProductRecord` or a dict keyed by the sink's fieldnames."""
+        values = row.as_row() if isinstance(row, ProductRecord) else [row.get(name) for name in self.FIELDNAMES]
+        if self._writer is not None:
+            self._writer.writerow(values)
+        if self._parquet is not None:
+            self._buffer.append(values)
+            if len(self._buffer) >= PARQUET_ROW_GROUP:
+                self.flush_parquet()
+        self.ROWS_WRITTEN += 1
+
+    def flush_parquet(self):
+        if self._buffer:
+            columns = {
+                name: [None if values[index] is None else str(values[index]) for values in self._buffer]
+                for index, name in enumerate(self.FIELDNAMES)
+            }
+            self._parquet.write_table(pa.table(columns, schema=self._parquet.schema))
+            self._buffer = []
+
+    def close(self):
+        if self._csv is not None:
+            self._csv.close()
+            self._csv = None
+        if self._parquet is not None:
+            self.flush_parquet()
+            self._parquet.close()
+            self._parquet = None
+
+
+class HttpClient:
+    """Pooled impersonating client shared by every CES call site.
+
+    Each worker thread gets its own long-lived `Session` and the event loop gets one
+    `AsyncSession`, so connections stay alive (HTTP/2 is negotiated by the impersonated
+    TLS fingerprint and multiplexed by libcurl) instead of paying a handshake per call.
+    Latency and new-connection counts are recorded for every request.
+    """
+
+    def __init__(self, headers=None, impersonate=IMPERSONATE, max_clients=MAX_WORKERS,
+                 record_dir=None, replay_dir=None, upstream=None):
+        self.HEADERS = headers or HEADERS
+        self.RECORD_DIR = record_dir
+        self.REPLAY_DIR = replay_dir
+        self.ARCHIVE = FixtureArchive(replay_dir) if replay_dir else None
+        self.UPSTREAM = upstream.rstrip("/") if upstream else None
+        self.IMPERSONATE = impersonate
+        self.MAX_CLIENTS = max_clients
+        self._local = threading.local()
+        self._sessions = []
+        self._async_session = None
+        self._lock = threading.Lock()
+        self.REQUESTS = 0
+        self.CONNECTIONS = 0
+        self.LATENCIES = []
+        self.CONNECTION_KEYS = set()
+
+    def session(self):
+        """Return the calling thread's session, creating it on first use."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session(impersonate=self.IMPERSONATE)
+            session.headers.update(self.HEADERS)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def async_session(self):
+        """Return the AsyncSession for the running event loop, creating it on first use."""
+        if self._async_session is None:
+            self._async_session = AsyncSession(impersonate=self.IMPERSONATE, max_clients=self.MAX_CLIENTS)
+            self._async_session.headers.update(self.HEADERS)
+        return self._async_session
+
+    def record(self, response, started):
+        """Record latency and whether the transfer had to open a new connection.
+
+        A connection is identified by its local/remote socket pair, so a pair not seen
+        before means a fresh TCP+TLS handshake.
+        """
+        latency = time.perf_counter() - started
+        connection_key = (
+            getattr(response, "local_ip", None),
+            getattr(response, "local_port", None),
+            getattr(response, "primary_ip", None),
+            getattr(response, "primary_port", None),
+        )
+        with self._lock:
+            self.REQUESTS += 1
+            if connection_key not in self.CONNECTION_KEYS:
+                self.CONNECTION_KEYS.add(connection_key)
+                self.CONNECTIONS += 1
+            self.LATENCIES.append(latency)
+        return response
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+        started = time.perf_counter()
+        if self.REPLAY_DIR:
+            return self.record(self.load_fixture(method, url, kwargs.get("json")), started)
+        response = self.session().request(method, self.route(url), **kwargs)
+        self.save_fixture(method, url, kwargs.get("json"), response)
+        return self.record(response, started)
+
+    async def arequest(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+        started = time.perf_counter()
+        if self.REPLAY_DIR:
+            return self.record(self.load_fixture(method, url, kwargs.get("json")), started)
+        response = await self.async_session().request(method, self.route(url), **kwargs)
+        self.save_fixture(method, url, kwargs.get("json"), response)
+        return self.record(response, started)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    async def aget(self, url, **kwargs):
+        return await self.arequest("GET", url, **kwargs)
+
+    async def apost(self, url, **kwargs):
+        return await self.arequest("POST", url, **kwargs)
+
+    def route(self, url):
+        """Send requests for the live origin to the stand-in server when one is configured."""
+        if self.UPSTREAM and url.startswith(ORIGIN):
+            return self.UPSTREAM + url[len(ORIGIN):]
+        return url
+
+    def save_fixture(self, method, url, json_data, response):
+        """In record mode, archive the response under its `fixture_key`."""
+        if not self.RECORD_DIR:
+            return
+        os.makedirs(self.RECORD_DIR, exist_ok=True)
+        fixture = {
+            "method": method,
+            "url": url,
+            "json": json_data,
+            "status_code": response.status_code,
+            "headers": {name: response.headers[name] for name in FIXTURE_HEADERS if response.headers.get(name)},
+            "text": response.text,
+        }
+        with open(os.path.join(self.RECORD_DIR, fixture_key(method, url, json_data) + ".json"), "w", encoding="utf-8") as file:
+            json.dump(fixture, file, ensure_ascii=False)
+
+    def load_fixture(self, method, url, json_data):
+        """In replay mode, serve the archived response instead of touching the network."""
+        return ReplayResponse(url, *self.ARCHIVE.load(method, url, json_data))
+
+    async def aclose(self):
+        """Close the AsyncSession; it is bound to the loop that created it."""
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+
+    def stats(self):
+        """Summarise requests, handshakes (new connections), reuse and latency."""
+        with self._lock:
+            latencies = sorted(self.LATENCIES)
+            requests_made = self.REQUESTS
+            connections = self.CONNECTIONS
+        if not latencies:
+            return {"requests": 0, "handshakes": 0, "reused": 0}
+        return {
+            "requests": requests_made,
+            "handshakes": connections,
+            "reused": requests_made - connections,
+            "latency_avg": round(sum(latencies) / len(latencies), 4),
+            "latency_p50": round(latencies[len(latencies) // 2], 4),
+            "latency_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 4),
+            "latency_max": round(latencies[-1], 4),
+        }
+
+
+def parse_listing_bs4(html):
+    """Extract raw product fields and the next-page href from a listing page with BeautifulSoup.
+
+    Each product is `(href, title, stock_code, buying_option, impression)`; missing
+    attributes are None so every backend hands `Scraper.add_products` the same tuples.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    products = []
+
+    for product in soup.find_all("div", class_="product-item"):
+        link = product.find("a", class_="search-page-product")
+        stock_code = product.get("data-productsku", "No Stock Code")
+
+        description_div = product.find("div", class_="description")
+        description_items = [li.get_text(strip=True) for li in description_div.find_all("li")] if description_div else []
+
+        category_input = product.find("input", {"id": "impression"})
+        products.append((
+            link["href"] if link and link.has_attr("href") else None,
+            link["title"] if link and link.has_attr("title") else None,
+            stock_code,
+            ", ".join(description_items),
+            category_input["value"] if category_input and category_input.has_attr("value") else None,
+        ))
+
+    next_page_element = soup.select_one(".next-page a")
+    return products, next_page_element["href"] if next_page_element else None
+
+
+def has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+if lxml is not None:
+    PRODUCT_XPATH = etree.XPath(f"//div[{has_class('product-item')}]")
+    LINK_XPATH = etree.XPath(f"(.//a[{has_class('search-page-product')}])[1]")
+    DESCRIPTION_ITEMS_XPATH = etree.XPath(f"(.//div[{has_class('description')}])[1]//li")
+    IMPRESSION_XPATH = etree.XPath("(.//input[@id='impression'])[1]")
+    NEXT_PAGE_XPATH = etree.XPath(f"(//*[{has_class('next-page')}]//a)[1]")
+
+
+def parse_listing_lxml(html):
+    """Compiled-XPath equivalent of `parse_listing_bs4` on top of lxml."""
+    if not html.strip():
+        return [], None
+    tree = lxml.html.document_fromstring(html)
+    products = []
+
+    for product in PRODUCT_XPATH(tree):
+        link = LINK_XPATH(product)
+        link = link[0] if link else None
+        description_items = ["".join(text.strip() for text in li.itertext()) for li in DESCRIPTION_ITEMS_XPATH(product)]
+        category_input = IMPRESSION_XPATH(product)
+
+        products.append((
+            link.get("href") if link is not None else None,
+            link.get("title") if link is not None else None,
+            product.get("data-productsku", "No Stock Code"),
+            ", ".join(description_items),
+            category_input[0].get("value") if category_input else None,
+        ))
+
+    next_page_element = NEXT_PAGE_XPATH(tree)
+    return products, next_page_element[0].attrib["href"] if next_page_element else None
+
+
+PARSERS = {"bs4": parse_listing_bs4}
+if lxml is not None:
+    PARSERS["lxml"] = parse_listing_lxml
+DEFAULT_PARSER = "lxml" if "lxml" in PARSERS else "bs4"
+
+
 class Scraper:
-    def __init__(self):
+    def __init__(self, concurrent=False, max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT,
+                 chunk_size=CHUNK_SIZE, batch_concurrency=BATCH_CONCURRENCY, pipeline=False, parser=DEFAULT_PARSER,
+                 incremental=False, store_file=STORE_FILE, delta_file=DELTA_FILE,
+                 category_cache_file=CATEGORY_CACHE_FILE, category_ttl=CATEGORY_TTL, refresh_categories=False,
+                 output_file=OUTPUT_FILE, parquet_file=None, collect=True,
+                 record_dir=None, replay_dir=None, upstream=None):
         self.MASTER_LIST = []
+        self.RECORD_DIR = record_dir
+        self.REPLAY_DIR = replay_dir
+        self.UPSTREAM = upstream
+        self.PAGES = 0
+        self.PARSE_SECONDS = 0.0
+        self.OUTPUT_FILE = output_file
+        self.PARQUET_FILE = parquet_file
+        self.COLLECT = collect
+        self.ROWS_WRITTEN = 0
+        self.CATEGORY_CACHE_FILE = category_cache_file
+        self.CATEGORY_TTL = category_ttl
+        self.REFRESH_CATEGORIES = refresh_categories
+        self.CATEGORY_TREE = {}
+        self.REVALIDATION = None
+        self.INCREMENTAL = incremental
+        self.STORE_FILE = store_file
+        self.DELTA_FILE = delta_file
+        self.STORE = self.load_store() if incremental else None
+        self.UNCHANGED_PAGES = 0
+        self.PARSER = parser if parser in PARSERS else "bs4"
+        self.PIPELINE = pipeline
+        self.CONCURRENT = concurrent or pipeline
+        self.MAX_WORKERS = max_workers
+        self.PER_HOST_LIMIT = per_host_limit
+        self.HOST_LIMITS = {}
+        self.CHUNK_SIZE = chunk_size
+        self.BATCH_CONCURRENCY = batch_concurrency
+        self.BATCH_TIMINGS = []
+        self.BATCH_LIMIT = None
+        self.ENRICH_QUEUE = None
+        self.LOOP = None
         self.CLIENT = self.make_session()
         
         self.DEBUG = False
@@ -55,25 +530,30 @@ class Scraper:
                 datefmt="%d-%b-%y %H:%M:%S",
             )
 
-        logging.info(f"STARTING SCRAPE... {JOB_NAME}")
+        logging.info(f"STARTING SCRAPE... {JOB_NAME} | CONCURRENT: {self.CONCURRENT} | PIPELINE: {self.PIPELINE}")
+        if self.PARSER != parser:
+            logging.warning(f"Parser backend '{parser}' is not available, falling back to bs4.")
         time.sleep(2)
     
     def make_session(self, headers=None):
-        session = requests.Session()
-        default_headers = HEADERS
-        session.headers.update(headers or default_headers)
-        return 
+        return HttpClient(
+            headers=headers,
+            max_clients=self.MAX_WORKERS,
+            record_dir=self.RECORD_DIR,
+            replay_dir=self.REPLAY_DIR,
+            upstream=self.UPSTREAM,
+        )
     
     def make_request(self, url, method="GET", data=None):
         if method == "GET":
-            return self.CLIENT.get(url, timeout=60)
+            return self.CLIENT.get(url)
         elif method == "POST" and data:
-            return self.CLIENT.post(url, data=data, timeout=60)
+            return self.CLIENT.post(url, data=data)
         return None
     
     def fetch_html(self,url):
         """Fetch the HTML content of a page."""
-        response = requests.get(url, headers=HEADERS)
+        response = self.CLIENT.get(url)
         if response.status_code == 200:
             return response.text
         return None
@@ -84,218 +564,679 @@ class Scraper:
         time_ids = []
         stock_ids = []
 
-        if base_url in [
-            "https://www.cityelectricsupply.com/thhn-wire",
-        ]:
-            response = requests.get(base_url, headers=HEADERS, impersonate="chrome110")
-            soup = BeautifulSoup(response.text, "html.parser")
-            subcategories = soup.select(".sub-category-item a")
-            if subcategories:
-                subcategory_urls = [
-                    f"https://www.cityelectricsupply.com{a['href']}" for a in subcategories if 'href' in a.attrs
-                ]
-                
-                for sub_url in subcategory_urls:
-                    logging.info(f"🔄 Visiting subcategory: {sub_url}")
-                    sub_product_details, sub_time_ids, sub_stock_ids = self.scrape_products(sub_url)
-                    all_products.update(sub_product_details)
-                    time_ids.extend(sub_time_ids)
-                    stock_ids.extend(sub_stock_ids)
-
-                return all_products, time_ids, stock_ids
-
-        if base_url in [
-                    "https://www.cityelectricsupply.com/wire-cord-cable"
-                ]:
-            response = requests.get(base_url, headers=HEADERS, impersonate="chrome110")
-            soup = BeautifulSoup(response.text, "html.parser")
-            subcategories = soup.select(".sub-category-item a")
-            if subcategories:
-                subcategory_urls = [
-                    f"https://www.cityelectricsupply.com{a['href']}" for a in subcategories if 'href' in a.attrs
-                ]
-
-                sub_subcategory_urls = [] 
-
-                for subcategory_url in subcategory_urls:
-                    response = requests.get(subcategory_url, headers=HEADERS, impersonate="chrome110")
-                    sub_soup = BeautifulSoup(response.text, "html.parser")
-
-                    sub_subcategories = sub_soup.select(".category-grid.sub-category-grid .item-box .sub-category-item h2.title a")
-
-                    if sub_subcategories:
-                        sub_subcategory_urls = [
-                            f"https://www.cityelectricsupply.com{a['href']}" for a in sub_subcategories if 'href' in a.attrs
-                        ]
-                        for sub_url in sub_subcategory_urls:
-                            logging.info(f"🔄 Visiting subcategory: {sub_url}")
-                            sub_product_details, sub_time_ids, sub_stock_ids = self.scrape_products(sub_url)
-                            all_products.update(sub_product_details)
-                            time_ids.extend(sub_time_ids)
-                            stock_ids.extend(sub_stock_ids)
-
-                        return all_products, time_ids, stock_ids
-
-        next_page = base_url  
+        for listing_url in self.CATEGORY_TREE.get(base_url) or [base_url]:
+            if listing_url != base_url:
+                logging.info(f"🔄 Visiting subcategory: {listing_url}")
+            self.scrape_listing(listing_url, all_products, time_ids, stock_ids)
+
+        return all_products, time_ids, stock_ids
+
+    def scrape_listing(self, listing_url, all_products, time_ids, stock_ids):
+        """Follow the `.next-page` chain of one listing URL into the given accumulators."""
+        next_page = listing_url  
 
         while next_page:
             logging.info(f"Scraping: {next_page}") 
-            response = requests.get(next_page, headers=HEADERS, impersonate="chrome110")
+            response = self.CLIENT.get(next_page, headers=self.conditional_headers(next_page))
             
-            if response.status_code != 200:
+            if response.status_code not in (200, 304):
                 logging.error(f"Failed to fetch {next_page}")
                 break
             
-            soup = BeautifulSoup(response.text, "html.parser")
-            products = soup.find_all("div", class_="product-item")
+            products, next_href = self.extract_listing(next_page, response)
+            next_page = self.add_products(products, next_href, listing_url, all_products, time_ids, stock_ids)
 
-            for product in products:
-                link = product.find("a", class_="search-page-product")
-                stock_code = product.get("data-productsku", "No Stock Code")
+    def add_products(self, products, next_href, base_url, all_products, time_ids, stock_ids):
+        """Turn raw listing tuples into `ProductRecord`s in the given accumulators and return the next page URL."""
+        for href, title, stock_code, buying_option, impression in products:
+            catalog_code = "No Catalog Code"
+            product_category = "No Product Category"
+            ims_id = ""
 
-                description_div = product.find("div", class_="description")
-                description_items = [li.get_text(strip=True) for li in description_div.find_all("li")] if description_div else []
-                buying_option = ", ".join(description_items)
+            if impression is not None:
+                try:
+                    category_data = json.loads(impression)
+                    catalog_code = category_data.get("ManufacturerPartNumber", "No Catalog Code")
+                    product_category = category_data.get("Category3", "No Category")
+                    ims_id = str(category_data.get("Id", ""))
 
-                category_input = product.find("input", {"id": "impression"})
-                catalog_code = "No Catalog Code"
-                product_category = "No Product Category"
-                ims_id = ""
+                    if ims_id:
+                        time_ids.append(ims_id)
+                        all_products[ims_id] = ProductRecord(
+                            base_url=base_url,
+                            category=product_category,
+                            product_url="https://www.cityelectricsupply.com" + href if href is not None else "No URL",
+                            product_name=title if title is not None else "No Title",
+                            catalog_code=catalog_code,
+                            stock_code=stock_code,
+                            buying_option=buying_option,
+                        )
 
-                if category_input and category_input.has_attr("value"):
-                    try:
-                        category_data = json.loads(category_input["value"])
-                        catalog_code = category_data.get("ManufacturerPartNumber", "No Catalog Code")
-                        product_category = category_data.get("Category3", "No Category")
-                        ims_id = str(category_data.get("Id", ""))
-
-                        if ims_id:
-                            time_ids.append(ims_id)
-                            all_products[ims_id] = {
-                                "scrape_datetime": SCRAPE_DATETIME.isoformat(),
-                                "base_url": base_url,
-                                "category": product_category,
-                                "product_url": "https://www.cityelectricsupply.com" + link["href"] if link and link.has_attr("href") else "No URL",
-                                "product_name": link["title"] if link and link.has_attr("title") else "No Title",
-                                "catalog_code": catalog_code,
-                                "stock_code": stock_code,
-                                "availability": "N/A",
-                                "buying_option": buying_option,
-                                "price": "N/A"
-                            }
-
-                        if stock_code:
-                            stock_ids.append(stock_code)
-                    except json.JSONDecodeError:
-                        pass
+                    if stock_code:
+                        stock_ids.append(stock_code)
+                except json.JSONDecodeError:
+                    pass
+
+        return f"https://www.cityelectricsupply.com{next_href}" if next_href is not None else None
+
+    def parse_listing(self, html):
+        """Run the configured parser backend, accumulating PARSE_SECONDS."""
+        started = time.perf_counter()
+        try:
+            return PARSERS[self.PARSER](html)
+        finally:
+            self.PARSE_SECONDS += time.perf_counter() - started
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a listing page already in the store."""
+        page = self.STORE["pages"].get(url) if self.STORE is not None else None
+        headers = {}
+        if page and page.get("etag"):
+            headers["If-None-Match"] = page["etag"]
+        if page and page.get("last_modified"):
+            headers["If-Modified-Since"] = page["last_modified"]
+        return headers
+
+    def extract_listing(self, url, response):
+        """Return `(products, next_href)` for a listing response, reusing the stored parse of an unchanged page."""
+        self.PAGES += 1
+        if self.STORE is None:
+            return self.parse_listing(response.text)
+
+        page = self.STORE["pages"].get(url)
+        if page and (response.status_code == 304 or page["hash"] == hashlib.sha1(response.content).hexdigest()):
+            self.UNCHANGED_PAGES += 1
+            return [tuple(product) for product in page["products"]], page["next_href"]
+
+        products, next_href = self.parse_listing(response.text)
+        self.STORE["pages"][url] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "hash": hashlib.sha1(response.content).hexdigest(),
+            "products": products,
+            "next_href": next_href,
+        }
+        return products, next_href
+
+    def load_store(self):
+        """Load the incremental store: parsed listing pages by URL and last emitted rows by IMS ID."""
+        if os.path.exists(self.STORE_FILE):
+            with open(self.STORE_FILE, "r", encoding="utf-8") as file:
+                return json.load(file)
+        return {"pages": {}, "products": {}}
+
+    def save_store(self):
+        os.makedirs(os.path.dirname(self.STORE_FILE) or ".", exist_ok=True)
+        temp_file = self.STORE_FILE + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as file:
+            json.dump(self.STORE, file, ensure_ascii=False)
+        os.replace(temp_file, self.STORE_FILE)
+
+    def compute_delta(self, products):
+        """Compare this run's `{ims_id: row}` against the store and return new/changed/removed rows, updating the store."""
+        previous = self.STORE["products"]
+        delta = []
+        for ims_id, details in products.items():
+            before = previous.get(ims_id)
+            if before is None:
+                delta.append({**details, "change": "new"})
+            elif any(before.get(field) != details[field] for field in details if field != "scrape_datetime"):
+                delta.append({**details, "change": "changed"})
 
-            next_page_element = soup.select_one(".next-page a")
-            next_page = f"https://www.cityelectricsupply.com{next_page_element['href']}" if next_page_element else None
+        for ims_id, details in previous.items():
+            if ims_id not in products:
+                delta.append({**details, "scrape_datetime": SCRAPE_DATETIME_ISO, "change": "removed"})
+
+        self.STORE["products"] = products
+        return delta
+
+    def subcategory_urls(self, html):
+        """Return the absolute, de-duplicated subcategory URLs linked from a category page."""
+        soup = BeautifulSoup(html, "html.parser")
+        links = soup.select(SUB_SUBCATEGORY_SELECTOR) or soup.select(SUBCATEGORY_SELECTOR)
+        return list(dict.fromkeys(
+            f"https://www.cityelectricsupply.com{a['href']}" for a in links if 'href' in a.attrs
+        ))
+
+    def resolve_category_tree(self):
+        """Return `{base_url: [leaf listing URLs]}`, from the cache when it is fresh enough.
+
+        A cache older than the TTL is still used for this run while a background
+        thread rediscovers the tree for the next one.
+        """
+        cache = self.load_category_cache()
+        if cache and all(base_url in cache["tree"] for base_url in BASE_URLS):
+            age = time.time() - cache["fetched_at"]
+            if self.CATEGORY_TTL is None or age >= self.CATEGORY_TTL:
+                logging.info(f"Category tree cache is {age / 3600:.1f}h old, revalidating in the background.")
+                self.REVALIDATION = threading.Thread(target=self.revalidate_category_tree, name="category-revalidation")
+                self.REVALIDATION.start()
+            return cache["tree"]
+
+        tree, failed = self.run_async(self.discover_category_tree_async(BASE_URLS, self.CLIENT))
+        return self.settle_category_tree(tree, failed)
+
+    def revalidate_category_tree(self):
+        """Rediscover the category tree on a separate client and event loop and refresh the cache."""
+        client = self.make_session()
+
+        async def runner():
+            try:
+                return await self.discover_category_tree_async(BASE_URLS, client)
+            finally:
+                await client.aclose()
+
+        try:
+            self.settle_category_tree(*asyncio.run(runner()))
+        except Exception as e:
+            logging.error(f"Category tree revalidation failed - Exception: {e}")
+        finally:
+            client.close()
+
+    async def discover_category_tree_async(self, base_urls, client):
+        """Breadth-first walk of every base URL's category pages; pages without subcategories are leaves.
+
+        Each level is fetched concurrently. Leaves are returned in depth-first link order so
+        the crawl order is stable from run to run. Returns `(tree, failed)`, where `failed`
+        holds the base URLs whose walk hit a page that could not be fetched; such a page is
+        crawled as a listing for this run but its subtree is unknown.
+        """
+        limit = asyncio.Semaphore(self.PER_HOST_LIMIT)
+        children = {}
+        failed_pages = set()
+
+        async def fetch_children(url):
+            """Subcategory URLs of a page, [] for a leaf, or None when the page could not be fetched."""
+            try:
+                async with limit:
+                    response = await client.aget(url)
+            except Exception as e:
+                logging.error(f"Failed to fetch category page {url} - Exception: {e}")
+                return url, None
+            if response.status_code != 200:
+                logging.error(f"Failed to fetch category page {url} (status {response.status_code})")
+                return url, None
+            return url, self.subcategory_urls(response.text)
+
+        frontier = list(dict.fromkeys(base_urls))
+        for depth in range(MAX_CATEGORY_DEPTH + 1):
+            if not frontier:
+                break
+            logging.info(f"Discovering categories: level {depth}, {len(frontier)} pages")
+            for url, urls in await asyncio.gather(*[fetch_children(url) for url in frontier]):
+                if urls is None:
+                    failed_pages.add(url)
+                    urls = []
+                children[url] = [child for child in urls if child not in children and child != url]
+            if depth == MAX_CATEGORY_DEPTH:
+                break
+            frontier = list(dict.fromkeys(
+                child for url in frontier for child in children[url] if child not in children
+            ))
+
+        def leaves(url, path):
+            if not children.get(url) or url in path:
+                return [url]
+            return [leaf for child in children[url] for leaf in leaves(child, path | {url})]
+
+        tree = {base_url: list(dict.fromkeys(leaves(base_url, frozenset()))) for base_url in base_urls}
+        return tree, {base_url for base_url, urls in tree.items() if failed_pages.intersection(urls)}
+
+    def settle_category_tree(self, tree, failed):
+        """Cache a discovered tree and return the one to crawl this run.
+
+        Subtrees that hit a failed page are never cached as if the page were a leaf: the
+        previously cached subtree for that base URL is used and kept instead, and the cache
+        is saved as stale so the next run revalidates it. A failed base URL with no previous
+        entry is left out of the cache, which makes the next run rediscover it.
+        """
+        if not failed:
+            self.save_category_cache(tree)
+            return tree
+
+        previous = self.read_category_cache()
+        previous_tree = previous["tree"] if previous else {}
+        logging.warning(f"Category discovery failed under {', '.join(sorted(failed))}; not caching those subtrees.")
+        merged = {
+            base_url: previous_tree.get(base_url, urls) if base_url in failed else urls
+            for base_url, urls in tree.items()
+        }
+        self.save_category_cache(
+            {base_url: urls for base_url, urls in merged.items() if base_url not in failed or base_url in previous_tree},
+            fetched_at=0,
+        )
+        return merged
+
+    def load_category_cache(self):
+        if self.REFRESH_CATEGORIES:
+            return None
+        return self.read_category_cache()
+
+    def read_category_cache(self):
+        if not os.path.exists(self.CATEGORY_CACHE_FILE):
+            return None
+        with open(self.CATEGORY_CACHE_FILE, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def save_category_cache(self, tree, fetched_at=None):
+        os.makedirs(os.path.dirname(self.CATEGORY_CACHE_FILE) or ".", exist_ok=True)
+        temp_file = self.CATEGORY_CACHE_FILE + f".{threading.get_ident()}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as file:
+            json.dump({"fetched_at": time.time() if fetched_at is None else fetched_at, "tree": tree}, file, indent=2)
+        os.replace(temp_file, self.CATEGORY_CACHE_FILE)
+        logging.info(f"Category tree saved to {self.CATEGORY_CACHE_FILE}: {sum(len(urls) for urls in tree.values())} listings")
+
+    async def fetch_page_async(self, url, headers=None):
+        """GET a page through the pooled AsyncSession, bounded by the per-host limit."""
+        host = urlsplit(url).netloc
+        if host not in self.HOST_LIMITS:
+            self.HOST_LIMITS[host] = asyncio.Semaphore(self.PER_HOST_LIMIT)
+        async with self.HOST_LIMITS[host]:
+            return await self.CLIENT.aget(url, headers=headers)
+
+    async def scrape_listing_async(self, listing_url):
+        """Follow the `.next-page` chain of one listing URL."""
+        all_products = {}
+        time_ids = []
+        stock_ids = []
+
+        next_page = listing_url
+        while next_page:
+            logging.info(f"Scraping: {next_page}")
+            response = await self.fetch_page_async(next_page, headers=self.conditional_headers(next_page))
+
+            if response.status_code not in (200, 304):
+                logging.error(f"Failed to fetch {next_page}")
+                break
+
+            seen_ids, seen_skus = len(time_ids), len(stock_ids)
+            products, next_href = self.extract_listing(next_page, response)
+            next_page = self.add_products(products, next_href, listing_url, all_products, time_ids, stock_ids)
+            if self.ENRICH_QUEUE is not None:
+                self.ENRICH_QUEUE.put_nowait((time_ids[seen_ids:], stock_ids[seen_skus:]))
 
         return all_products, time_ids, stock_ids
 
+    async def scrape_all_products_async(self, base_urls):
+        """Crawl every base URL through a bounded worker pool, yielding `(base_url, scrape_products output)`.
+
+        Base URLs are yielded in order as soon as all of their listings are crawled, while the
+        workers carry on with the later ones.
+        """
+        listings = [self.CATEGORY_TREE.get(base_url) or [base_url] for base_url in base_urls]
+
+        queue = asyncio.Queue()
+        for base_index, listing_urls in enumerate(listings):
+            for listing_index, listing_url in enumerate(listing_urls):
+                queue.put_nowait((base_index, listing_index, listing_url))
+
+        results = {}
+        remaining = [len(listing_urls) for listing_urls in listings]
+        crawled = [asyncio.get_running_loop().create_future() for _ in base_urls]
+
+        def finish(base_index):
+            # Merge in listing order so the output matches the sequential crawl.
+            all_products = {}
+            time_ids = []
+            stock_ids = []
+            for listing_index in range(len(listings[base_index])):
+                products, sub_time_ids, sub_stock_ids = results.pop((base_index, listing_index))
+                all_products.update(products)
+                time_ids.extend(sub_time_ids)
+                stock_ids.extend(sub_stock_ids)
+            crawled[base_index].set_result((all_products, time_ids, stock_ids))
+
+        async def worker():
+            while True:
+                base_index, listing_index, listing_url = await queue.get()
+                try:
+                    logging.info(f"🔄 Visiting subcategory: {listing_url}")
+                    results[(base_index, listing_index)] = await self.scrape_listing_async(listing_url)
+                except Exception as e:
+                    logging.error(f"Failed to scrape {listing_url} - Exception: {e}")
+                    results[(base_index, listing_index)] = ({}, [], [])
+                finally:
+                    queue.task_done()
+                remaining[base_index] -= 1
+                if not remaining[base_index]:
+                    finish(base_index)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.MAX_WORKERS)]
+        try:
+            for base_index, base_url in enumerate(base_urls):
+                yield base_url, await crawled[base_index]
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
     def fetch_prices(self,time_ids):
         """Fetch product prices."""
-        imsid_to_price = {}
-        if time_ids:
-            price_url = "https://www.cityelectricsupply.com/product/lazyprice"
-            json_data = {"imsIds": time_ids}
-            price_response = requests.post(price_url, headers=HEADERS, json=json_data)
-            
-            if price_response.status_code == 200:
-                try:
-                    price_data = price_response.json()
-                    for item in price_data:
-                        ims_id = str(item.get("ImsId", ""))
-                        display_price = item.get("DisplayPrice", "N/A")
-                        if ims_id:
-                            imsid_to_price[ims_id] = display_price
-                except json.JSONDecodeError:
-                    pass
-        return imsid_to_price
+        return self.run_async(self.fetch_prices_async(time_ids))
 
     def fetch_availability(self,stock_ids):
         """Fetch stock availability."""
+        return self.run_async(self.fetch_availability_async(stock_ids))
+
+    async def fetch_prices_async(self, time_ids):
+        """Fetch product prices in chunks through the batch engine."""
+        return await self.fetch_batches_async(PRICE_URL, "imsIds", time_ids, self.parse_prices)
+
+    async def fetch_availability_async(self, stock_ids):
+        """Fetch stock availability in chunks through the batch engine."""
+        return await self.fetch_batches_async(INVENTORY_URL, "skus", stock_ids, self.parse_availability)
+
+    def parse_prices(self, price_data):
+        imsid_to_price = {}
+        for item in price_data:
+            ims_id = str(item.get("ImsId", ""))
+            display_price = item.get("DisplayPrice", "N/A")
+            if ims_id:
+                imsid_to_price[ims_id] = display_price
+        return imsid_to_price
+
+    def parse_availability(self, avail_data):
         stock_availability = {}
-        if stock_ids:
-            avail_url = "https://www.cityelectricsupply.com/product/lazyinventory"
-            json_data = {"skus": stock_ids}
-            avail_response = requests.post(avail_url, headers=HEADERS, json=json_data)
+        for item in avail_data:
+            sku = item.get("Sku")
+            quantity = item.get("Total", 0)
+            location_stocks = item.get("Overview", {}).get("LocationStocks", [])
             
-            if avail_response.status_code == 200:
-                try:
-                    avail_data = avail_response.json()
-                    for item in avail_data:
-                        sku = item.get("Sku")
-                        quantity = item.get("Total", 0)
-                        location_stocks = item.get("Overview", {}).get("LocationStocks", [])
-                        
-                        if location_stocks:
-                            quantity = location_stocks[0].get("Quantity", 0)
-                        
-                        stock_availability[sku] = f"Available: ({quantity} Feet)"
-                except json.JSONDecodeError:
-                    pass
+            if location_stocks:
+                quantity = location_stocks[0].get("Quantity", 0)
+            
+            stock_availability[sku] = f"Available: ({quantity} Feet)"
         return stock_availability
 
+    async def fetch_batches_async(self, url, payload_key, ids, parse_chunk):
+        """Dedupe `ids`, POST them in concurrent chunks with per-chunk retries and merge the parsed results.
+
+        A failed chunk only loses its own IDs; timings for every chunk are kept in BATCH_TIMINGS.
+        """
+        unique_ids = list(dict.fromkeys(i for i in ids if i))
+        if not unique_ids:
+            return {}
+
+        chunks = [unique_ids[i:i + self.CHUNK_SIZE] for i in range(0, len(unique_ids), self.CHUNK_SIZE)]
+        endpoint = url.rsplit("/", 1)[-1]
+        timings = []
+
+        async def fetch_chunk(index, chunk):
+            async with self.BATCH_LIMIT:
+                started = time.perf_counter()
+                for attempt in range(1, BATCH_ATTEMPTS + 1):
+                    try:
+                        response = await self.CLIENT.apost(url, json={payload_key: chunk})
+                        if response.status_code == 200:
+                            result = parse_chunk(response.json())
+                            self.record_batch(timings, endpoint, index, len(chunk), attempt, started, True)
+                            return result
+                        logging.error(f"{endpoint} chunk {index} returned {response.status_code}. Retrying {attempt}/{BATCH_ATTEMPTS} attempts.")
+                    except Exception as e:
+                        logging.error(f"{endpoint} chunk {index} failed - Exception: {e}. Retrying {attempt}/{BATCH_ATTEMPTS} attempts.")
+                    if attempt < BATCH_ATTEMPTS:
+                        await asyncio.sleep(BATCH_BACKOFF * attempt)
+                self.record_batch(timings, endpoint, index, len(chunk), BATCH_ATTEMPTS, started, False)
+                return {}
+
+        results = await asyncio.gather(*[fetch_chunk(index, chunk) for index, chunk in enumerate(chunks)])
+
+        merged = {}
+        for result in results:
+            merged.update(result)
+
+        seconds = [t["seconds"] for t in timings]
+        failed = sum(1 for t in timings if not t["ok"])
+        logging.info(
+            f"{endpoint}: {len(unique_ids)} ids in {len(chunks)} chunks of {self.CHUNK_SIZE} | "
+            f"avg {sum(seconds) / len(seconds):.3f}s, max {max(seconds):.3f}s, failed {failed}"
+        )
+        return merged
+
+    def record_batch(self, timings, endpoint, index, size, attempts, started, ok):
+        timing = {
+            "endpoint": endpoint,
+            "chunk": index,
+            "size": size,
+            "attempts": attempts,
+            "seconds": round(time.perf_counter() - started, 4),
+            "ok": ok,
+        }
+        timings.append(timing)
+        self.BATCH_TIMINGS.append(timing)
+
+    def run_async(self, coro):
+        """Run a coroutine on the scraper's long-lived event loop.
+
+        Category discovery, every base URL's price and stock batches and the concurrent crawl
+        all reuse this loop and its one AsyncSession; `close_async` shuts both down.
+        """
+        async def runner():
+            if self.BATCH_LIMIT is None:
+                self.BATCH_LIMIT = asyncio.Semaphore(self.BATCH_CONCURRENCY)
+            return await coro
+
+        if self.LOOP is None:
+            self.LOOP = asyncio.new_event_loop()
+        return self.LOOP.run_until_complete(runner())
+
+    def close_async(self):
+        """Close the AsyncSession and the event loop it is bound to."""
+        if self.LOOP is None:
+            return
+        try:
+            self.LOOP.run_until_complete(self.CLIENT.aclose())
+            self.LOOP.run_until_complete(self.LOOP.shutdown_asyncgens())
+        finally:
+            self.LOOP.close()
+            self.LOOP = None
+            self.HOST_LIMITS = {}
+            self.BATCH_LIMIT = None
+
+    async def stream_products_async(self, base_urls, sink, all_products, products_by_id):
+        """Crawl concurrently and write each base URL's rows as soon as its listings and enrichment are done.
+
+        With --pipeline, prices and stock are fetched in the background while pages are crawled,
+        so a finished base URL only waits for its last partial chunks; otherwise they are fetched
+        once its crawl completes, while the workers move on to the later base URLs.
+        """
+        imsid_to_price = {}
+        stock_availability = {}
+        enricher = None
+        if self.PIPELINE:
+            self.ENRICH_QUEUE = asyncio.Queue()
+            enricher = asyncio.create_task(self.enrich_stream_async(self.ENRICH_QUEUE, imsid_to_price, stock_availability))
+        try:
+            async for base_url, (product_details, time_ids, stock_ids) in self.scrape_all_products_async(base_urls):
+                if enricher is not None:
+                    flushed = asyncio.get_running_loop().create_future()
+                    self.ENRICH_QUEUE.put_nowait(flushed)
+                    await flushed
+                else:
+                    imsid_to_price, stock_availability = await asyncio.gather(
+                        self.fetch_prices_async(time_ids), self.fetch_availability_async(stock_ids)
+                    )
+                self.write_products(sink, base_url, product_details, imsid_to_price, stock_availability,
+                                    all_products, products_by_id)
+        finally:
+            if enricher is not None:
+                self.ENRICH_QUEUE.put_nowait(None)
+                await enricher
+                self.ENRICH_QUEUE = None
+
+    async def enrich_stream_async(self, queue, imsid_to_price, stock_availability):
+        """Drain page IDs from `queue` and fetch prices/stock a full chunk at a time until a None arrives.
+
+        A Future on the queue flushes the partial chunks and is resolved once everything queued
+        before it has been fetched.
+        """
+        pending_ids, pending_skus = [], []
+        seen_ids, seen_skus = set(), set()
+        tasks = []
+
+        async def fetch_into(coro, target):
+            target.update(await coro)
+
+        async def resolve(waiting, flushed):
+            await asyncio.gather(*waiting)
+            flushed.set_result(None)
+
+        finished = False
+        while not finished:
+            item = await queue.get()
+            flushed = None
+            if item is None:
+                finished = True
+            elif isinstance(item, asyncio.Future):
+                flushed = item
+            else:
+                page_ids, page_skus = item
+                for ims_id in page_ids:
+                    if ims_id and ims_id not in seen_ids:
+                        seen_ids.add(ims_id)
+                        pending_ids.append(ims_id)
+                for sku in page_skus:
+                    if sku and sku not in seen_skus:
+                        seen_skus.add(sku)
+                        pending_skus.append(sku)
+
+            flush = finished or flushed is not None
+            if pending_ids and (flush or len(pending_ids) >= self.CHUNK_SIZE):
+                tasks.append(asyncio.create_task(fetch_into(self.fetch_prices_async(pending_ids), imsid_to_price)))
+                pending_ids = []
+            if pending_skus and (flush or len(pending_skus) >= self.CHUNK_SIZE):
+                tasks.append(asyncio.create_task(fetch_into(self.fetch_availability_async(pending_skus), stock_availability)))
+                pending_skus = []
+            if flushed is not None:
+                tasks.append(asyncio.create_task(resolve(list(tasks), flushed)))
+
+        await asyncio.gather(*tasks)
+
     def save_to_csv(self,data, filename):
         """Save scraped data to a CSV file."""
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        with open(filename, "w", newline="", encoding="utf-8") as csvfile:
-            fieldnames = [
-                "scrape_datetime", "base_url", "category", "product_url", "product_name", 
-                "catalog_code", "stock_code", "availability", "buying_option", "price"
-            ]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
+        sink = RowSink(csv_file=filename)
+        for row in data:
+            sink.write(row)
+        sink.close()
 
     def start_scraper(self):
-        """Main function to scrape all products with pagination."""
+        """Main function to scrape all products with pagination.
+
+        In every mode, rows are streamed to the sink as soon as each base URL is crawled and
+        enriched; MASTER_LIST is only filled when `collect` is set.
+        """
         all_products = []
-        for base_url in BASE_URLS:
-            product_details, time_ids, stock_ids = self.scrape_products(base_url)
-            imsid_to_price = self.fetch_prices(time_ids)
-            stock_availability = self.fetch_availability(stock_ids)
+        products_by_id = {}
+        sink = RowSink(csv_file=self.OUTPUT_FILE, parquet_file=self.PARQUET_FILE)
+        self.CATEGORY_TREE = self.resolve_category_tree()
+        if self.CONCURRENT:
+            self.run_async(self.stream_products_async(BASE_URLS, sink, all_products, products_by_id))
+        else:
+            for base_url in BASE_URLS:
+                product_details, time_ids, stock_ids = self.scrape_products(base_url)
+                imsid_to_price = self.fetch_prices(time_ids)
+                stock_availability = self.fetch_availability(stock_ids)
+                self.write_products(sink, base_url, product_details, imsid_to_price, stock_availability,
+                                    all_products, products_by_id)
+
+        sink.close()
+        self.ROWS_WRITTEN = sink.ROWS_WRITTEN
+        self.MASTER_LIST = all_products
+        if self.REVALIDATION is not None:
+            self.REVALIDATION.join()
+        logging.info(f"HTTP CLIENT STATS: {self.CLIENT.stats()}")
+        self.close_async()
+        self.CLIENT.close()
+        print(f"✅ Scraping completed. {self.ROWS_WRITTEN} rows saved to {self.OUTPUT_FILE}")
 
-            for ims_id, details in product_details.items():
-                details["price"] = imsid_to_price.get(ims_id, "N/A")
-                details["availability"] = stock_availability.get(details["stock_code"], "N/A")
+        if self.INCREMENTAL:
+            delta = self.compute_delta(products_by_id)
+            self.save_delta(delta, self.DELTA_FILE)
+            self.save_store()
+            logging.info(f"INCREMENTAL: {self.UNCHANGED_PAGES} unchanged pages reused, {len(delta)} delta rows saved to {self.DELTA_FILE}")
 
-                if "wire-cord-cable" in base_url:
-                    details["base_url"] = "https://www.cityelectricsupply.com/wire-cord-cable"
-                else:
-                    details["base_url"] = base_url
+    def write_products(self, sink, base_url, product_details, imsid_to_price, stock_availability,
+                       all_products, products_by_id):
+        """Price and stock one base URL's products and write them to the sink and the given accumulators."""
+        for ims_id, details in product_details.items():
+            details.price = imsid_to_price.get(ims_id, "N/A")
+            details.availability = stock_availability.get(details.stock_code, "N/A")
 
+            if "wire-cord-cable" in base_url:
+                details.base_url = sys.intern("https://www.cityelectricsupply.com/wire-cord-cable")
+            else:
+                details.base_url = sys.intern(base_url)
 
-                all_products.append(details)
+            sink.write(details)
+            if self.COLLECT:
+                all_products.append(details.as_dict())
+            if self.INCREMENTAL:
+                products_by_id[ims_id] = details.as_dict()
 
-        self.MASTER_LIST = all_products
-        self.save_to_csv(all_products, OUTPUT_FILE)
-        print(f"✅ Scraping completed. Data saved to {OUTPUT_FILE}")
+    def save_delta(self, delta, filename):
+        """Save the delta rows (full product row plus a `change` column) to a CSV file."""
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        with open(filename, "w", newline="", encoding="utf-8") as csvfile:
+            fieldnames = FIELDNAMES + ["change"]
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(delta)
 
 
-def run(filename: str):
-    scraper = Scraper()
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Scrape City Electric Supply Products.')
+    parser.add_argument('filename', type=str, nargs='?', default=OUTPUT_FILE,
+                        help=f'Output filename for scraped data (default: {OUTPUT_FILE}).')
+    parser.add_argument('--parquet', dest='parquet_file', type=str, default=None,
+                        help='Also write the rows to this Parquet file in the same pass.')
+    parser.add_argument('--concurrent', action='store_true',
+                        help='Crawl categories, subcategories and pages concurrently with AsyncSession.')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Fetch prices and stock in the background while pages are crawled (implies --concurrent).')
+    parser.add_argument('--workers', dest='max_workers', type=int, default=MAX_WORKERS,
+                        help=f'Worker pool size for concurrent mode (default: {MAX_WORKERS}).')
+    parser.add_argument('--per-host', dest='per_host_limit', type=int, default=PER_HOST_LIMIT,
+                        help=f'Concurrent requests allowed per host (default: {PER_HOST_LIMIT}).')
+    parser.add_argument('--parser', choices=["bs4", "lxml"], default=DEFAULT_PARSER,
+                        help=f'Listing page parser backend (default: {DEFAULT_PARSER}).')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Reuse unchanged listing pages from the local store and write a delta file.')
+    parser.add_argument('--store-file', type=str, default=STORE_FILE,
+                        help=f'Incremental store location (default: {STORE_FILE}).')
+    parser.add_argument('--delta-file', type=str, default=DELTA_FILE,
+                        help=f'Delta output for incremental runs (default: {DELTA_FILE}).')
+    parser.add_argument('--category-cache', dest='category_cache_file', type=str, default=CATEGORY_CACHE_FILE,
+                        help=f'Category tree cache location (default: {CATEGORY_CACHE_FILE}).')
+    parser.add_argument('--category-ttl', type=float, default=CATEGORY_TTL,
+                        help=f'Seconds before the cached category tree is revalidated (default: {CATEGORY_TTL}).')
+    parser.add_argument('--refresh-categories', action='store_true',
+                        help='Ignore the category tree cache and rediscover it before crawling.')
+    parser.add_argument('--record', dest='record_dir', type=str, default=None,
+                        help='Archive every response into this fixture directory.')
+    parser.add_argument('--replay', dest='replay_dir', type=str, default=None,
+                        help='Serve every response from this fixture directory instead of the network.')
+    parser.add_argument('--upstream', type=str, default=None,
+                        help=f'Send {ORIGIN} requests to this origin instead, e.g. a replay_server.py stand-in.')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f'IDs per lazyprice/lazyinventory request (default: {CHUNK_SIZE}).')
+    parser.add_argument('--batch-concurrency', type=int, default=BATCH_CONCURRENCY,
+                        help=f'Chunks in flight per batch call (default: {BATCH_CONCURRENCY}).')
+    return parser
+
+
+def run(filename: str, **options):
+    """Scrape and stream rows to `filename`; `options` are passed to `Scraper` (see `get_parser`)."""
+    scraper = Scraper(output_file=filename, collect=False, **options)
     scraper.start_scraper()
 
-    results = scraper.MASTER_LIST
-    if len(results) < 1:
+    if scraper.ROWS_WRITTEN < 1:
         logging.error("NO DATA SCRAPED. EXITING...")
         return
 
-    df = pd.DataFrame(results)
-
-    logging.info("GENERATING FINAL OUTPUT...")
-    df.to_csv(
-        filename,
-        encoding="utf-8",
-        quotechar='"',
-        quoting=csv.QUOTE_ALL,
-        index=False,
-    )
+    logging.info(f"FINAL OUTPUT WRITTEN: {scraper.ROWS_WRITTEN} rows")
 
 
 if __name__ == "__main__":
-    run(filename=OUTPUT_FILE)
+    options = vars(get_parser().parse_args())
+    run(filename=options.pop("filename"), **options)
     logging.info("ALL DONE")
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+Compare one-series-per-call trend requests with multi-series batches.
+
+Both runs share the rank type cache and the same window plan, so the only
+difference is how many series ride on each `analyze/trend` call:
+    python benchmark_batching.py --batch-sizes 1 5 10 --rate 2
+"""
+import argparse
+import logging
+import time
+from urllib.parse import urlsplit
+
+from scraper import BASE_URL, RANK_TYPE_CACHE_FILE, Scraper
+
+
+def run_batch_size(batch_size, options):
+    scraper = Scraper(historical=True, batch_size=batch_size, journal_file=None, **options)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    scraper.start_scraper()
+    wall = time.perf_counter() - started
+
+    points = {(row["brand"], row["model"], row["data_date"]): row["value"] for row in scraper.MASTER_LIST}
+    return {
+        "batch_size": batch_size,
+        "requests": scraper.STATS.snapshot()[urlsplit(BASE_URL).path]["requests"],
+        "points": len(points),
+        "wall_s": wall,
+        "points_per_s": len(points) / wall if wall else 0.0,
+        "digest": hash(frozenset(points.items())),
+    }
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Benchmark Dongchedi multi-series batching.')
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 5], help='Series per trend call to compare.')
+    parser.add_argument('--concurrent', action='store_true', help='Run each batch size with the thread pool.')
+    parser.add_argument('--rate', type=float, default=None, help='Requests/sec across all workers.')
+    parser.add_argument('--rank-type-cache', type=str, default=RANK_TYPE_CACHE_FILE, help='Rank type cache location.')
+    return parser
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    options = {"concurrent": args.concurrent, "rate": args.rate, "rank_type_cache": args.rank_type_cache}
+
+    results = [run_batch_size(batch_size, options) for batch_size in args.batch_sizes]
+
+    baseline = results[0]["digest"]
+    print(f"{'batch':>6} {'requests':>9} {'points':>8} {'wall s':>8} {'points/s':>9} {'same data':>10}")
+    for result in results:
+        print(
+            f"{result['batch_size']:>6} {result['requests']:>9} {result['points']:>8} {result['wall_s']:>8.2f} "
+            f"{result['points_per_s']:>9.1f} {str(result['digest'] == baseline):>10}"
+        )
@@ -4,9 +4,24 @@ import json
 import logging
 import random
 import csv
+import argparse
+import threading
+import sqlite3
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 import requests
+import numpy as np
 import pandas as pd
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
 # Constants
 BASE_URL = "https://index.dongchedi.com/dzx_index/analyze/trend"
@@ -17,42 +32,595 @@ output_filename = os.path.join(
 )
 SCRAPE_DATETIME = datetime.now(timezone.utc)
 
+STORE_FILE = os.path.join("16800-Dongchedi Index", "dongchedi-store.sqlite")
+HISTORY_START = datetime(2021, 1, 1).date()
+RANK_TYPE_CACHE_FILE = os.path.join("16800-Dongchedi Index", "rank-type-cache.json")
+RANK_TYPE_TTL = 7 * 24 * 3600
+BRAND_MENU_URL = "https://index.dongchedi.com/dzx_index/menu/brand_list"
+SERIES_MENU_URL = "https://index.dongchedi.com/dzx_index/menu/series_list"
+CATALOGUE_CACHE_FILE = os.path.join("16800-Dongchedi Index", "dongchedi-catalogue.json")
+CATALOGUE_TTL = 24 * 3600
+ALL_SERIES = {"series_id": -1, "series_name": "全部车型"}  # Brand-level series the trend API accepts for every brand
+JOURNAL_FILE = os.path.join("16800-Dongchedi Index", "dongchedi-journal.sqlite")
+CHECKPOINT_EVERY = 20  # Work units per journal commit
+WINDOW_DAYS = 366  # Fixed slice when the window planner is off or its probe fails; the narrowest span trend serves
+BATCH_SIZE = 1  # Series per trend call; 1 sends one series at a time
+
+# Concurrent mode settings
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 2.0
+BURST = 2
+
+# Retry settings
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 60.0
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+THROTTLE_STATUSES = frozenset({429, 503})
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 30.0
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every worker: `rate` requests/sec with bursts up to `burst`."""
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=BURST):
+        self.RATE = rate
+        self.BURST = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.BURST, self.tokens + (now - self.updated) * self.RATE)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.RATE
+            time.sleep(wait)
+
+
+def parse_shard(value):
+    """argparse type for `--shard i/N` (1-based): returns the 0-based (index, count)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/N, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {count}, got {index}")
+    return index - 1, count
+
+
+def shard_filename(filename, shard):
+    """`data.csv` → `data.shard-2-of-4.csv` for shard (1, 4)."""
+    stem, extension = os.path.splitext(filename)
+    return f"{stem}.shard-{shard[0] + 1}-of-{shard[1]}{extension}"
+
+
+def merge_partitions(paths, filename):
+    """Combine shard outputs (CSV or Parquet) into one file in run()'s schema.
+
+    Points are deduplicated on (brand, model, data_date), keeping the first partition's
+    copy; CSV values are carried through as text so nothing is reformatted. Series with
+    missing days between their first and last date are logged, since a missing or
+    mismatched partition shows up that way.
+    """
+    frames = []
+    for path in paths:
+        if path.endswith(".parquet"):
+            frame = pd.read_parquet(path)
+            frame["data_date"] = pd.to_datetime(frame["data_date"]).dt.strftime("%Y-%m-%d")
+            frames.append(frame.astype({"brand": str, "model": str, "scrape_datetime": str}))
+        else:
+            frames.append(pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8"))
+
+    df = pd.concat(frames, ignore_index=True)
+    rows = len(df)
+    df = df.drop_duplicates(subset=["brand", "model", "data_date"], keep="first")
+    logging.info(f"MERGED {len(paths)} partitions: {rows} rows, {rows - len(df)} duplicates dropped")
+
+    dates = pd.to_datetime(df["data_date"])
+    gaps = 0
+    for (brand, model), series_dates in dates.groupby([df["brand"], df["model"]]):
+        first, last = series_dates.min(), series_dates.max()
+        missing = (last - first).days + 1 - len(series_dates)
+        if missing:
+            gaps += 1
+            logging.warning(f"⚠ {brand} - {model}: {missing} days missing between {first:%Y-%m-%d} and {last:%Y-%m-%d}")
+    if gaps:
+        logging.warning(f"⚠ MERGED output has gaps in {gaps} series; check that every shard ran to completion")
+
+    if filename.endswith(".parquet"):
+        df.to_parquet(filename, index=False)
+    else:
+        df.to_csv(filename, encoding="utf-8", quotechar='"', quoting=csv.QUOTE_ALL, index=False)
+    return len(df)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring `Retry-After` (up to `max_delay`) when the server sends one."""
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, base_delay=BACKOFF_BASE, max_delay=BACKOFF_CAP,
+                 retryable_statuses=RETRYABLE_STATUSES):
+        self.MAX_ATTEMPTS = max_attempts
+        self.BASE_DELAY = base_delay
+        self.MAX_DELAY = max_delay
+        self.RETRYABLE_STATUSES = retryable_statuses
+
+    def is_retryable(self, response):
+        """Transport errors (no response) and the listed statuses are worth another attempt."""
+        return response is None or response.status_code in self.RETRYABLE_STATUSES
+
+    def delay(self, attempt, response=None):
+        """Seconds to wait before retry number `attempt` (0-based)."""
+        retry_after = self.retry_after(response)
+        if retry_after is not None:
+            if retry_after > self.MAX_DELAY:
+                logging.warning(f"⚠ Retry-After of {retry_after:.0f}s capped at {self.MAX_DELAY:.0f}s")
+                return self.MAX_DELAY
+            return retry_after
+        return random.uniform(0, min(self.MAX_DELAY, self.BASE_DELAY * 2 ** attempt))
+
+    @staticmethod
+    def retry_after(response):
+        """The `Retry-After` header in seconds (delta or HTTP date), or None."""
+        value = response.headers.get("Retry-After") if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+
+class CircuitBreaker:
+    """Pauses every worker once the site keeps throttling.
+
+    `threshold` consecutive throttle responses (429/503) open the breaker for `cooldown`
+    seconds, or longer (up to `max_pause`) when `Retry-After` asks for it; the next success
+    closes it again.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN, max_pause=BACKOFF_CAP):
+        self.THRESHOLD = threshold
+        self.COOLDOWN = cooldown
+        self.MAX_PAUSE = max(cooldown, max_pause)
+        self.failures = 0
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Block while the breaker is open; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                remaining = self.open_until - time.monotonic()
+            if remaining <= 0:
+                return waited
+            time.sleep(remaining)
+            waited += remaining
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+
+    def record_throttle(self, retry_after=None):
+        with self.lock:
+            self.failures += 1
+            if self.failures < self.THRESHOLD:
+                return
+            if retry_after and retry_after > self.MAX_PAUSE:
+                logging.warning(f"⚠ Retry-After of {retry_after:.0f}s capped at {self.MAX_PAUSE:.0f}s for the breaker")
+                retry_after = self.MAX_PAUSE
+            pause = max(self.COOLDOWN, retry_after or 0)
+            self.open_until = max(self.open_until, time.monotonic() + pause)
+            self.failures = 0
+        logging.warning(f"⏸ Site is throttling, pausing all requests for {pause:.0f}s")
+
+
+class EndpointStats:
+    """Thread-safe per-endpoint counters: requests, retries, failures and where the time went."""
+
+    FIELDS = ("requests", "retries", "failures", "latency_s", "backoff_s", "rate_wait_s", "breaker_wait_s")
+
+    def __init__(self):
+        self.ENDPOINTS = {}
+        self.lock = threading.Lock()
+
+    def add(self, endpoint, **counters):
+        with self.lock:
+            stats = self.ENDPOINTS.setdefault(endpoint, dict.fromkeys(self.FIELDS, 0))
+            for name, value in counters.items():
+                stats[name] += value
+
+    def total(self, name):
+        with self.lock:
+            return sum(stats[name] for stats in self.ENDPOINTS.values())
+
+    def snapshot(self):
+        with self.lock:
+            return {endpoint: dict(stats) for endpoint, stats in self.ENDPOINTS.items()}
+
+    def log_summary(self):
+        for endpoint, stats in self.snapshot().items():
+            logging.info(
+                f"STATS {endpoint}: {stats['requests']} requests, {stats['retries']} retries, {stats['failures']} failed | "
+                f"latency {stats['latency_s']:.1f}s, backoff {stats['backoff_s']:.1f}s, "
+                f"rate limit {stats['rate_wait_s']:.1f}s, breaker {stats['breaker_wait_s']:.1f}s"
+            )
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.snapshot(), file, indent=2)
 
-def retry_on_failure(func):
-    """Decorator to retry failed requests."""
-    def wrapper(*args, **kwargs):
-        MAX_ATTEMPTS = 3
-        attempts = MAX_ATTEMPTS
-        while attempts > 0:
+
+class RetryEngine:
+    """Sends requests through the rate limiter and circuit breaker, retrying per the policy."""
+
+    def __init__(self, policy, limiter, breaker, stats):
+        self.POLICY = policy
+        self.LIMITER = limiter
+        self.BREAKER = breaker
+        self.STATS = stats
+
+    def request(self, endpoint, send):
+        """Call `send()` until it returns a 200 response; returns None once retries run out."""
+        for attempt in range(self.POLICY.MAX_ATTEMPTS):
+            waited = self.BREAKER.wait()
+            started = time.monotonic()
+            self.LIMITER.acquire()
+            sent = time.monotonic()
+
+            error = None
             try:
-                time.sleep(random.uniform(1.5, 2.5))  # Shorter delay for speed
-                response = func(*args, **kwargs)
-                if response and response.status_code == 200:
-                    return response
-                else:
-                    logging.error(
-                        f"Request failed. Retrying {MAX_ATTEMPTS - attempts + 1}/{MAX_ATTEMPTS} attempts."
-                    )
-                    attempts -= 1
-                    time.sleep(5)
-            except Exception as e:
-                logging.error(
-                    f"An error occurred - Exception: {e}. Retrying {MAX_ATTEMPTS - attempts + 1}/{MAX_ATTEMPTS} attempts."
-                )
-                attempts -= 1
-                time.sleep(5)
-        logging.warning(f"All attempts failed. Unable to make successful request.")
+                response = send()
+            except requests.RequestException as e:
+                response, error = None, e
+            self.STATS.add(endpoint, requests=1, latency_s=time.monotonic() - sent,
+                           rate_wait_s=sent - started, breaker_wait_s=waited)
+
+            if response is not None and response.status_code == 200:
+                self.BREAKER.record_success()
+                return response
+            if not self.POLICY.is_retryable(response):
+                logging.error(f"Request to {endpoint} failed with non-retryable status {response.status_code}.")
+                break
+            if response is not None and response.status_code in THROTTLE_STATUSES:
+                self.BREAKER.record_throttle(self.POLICY.retry_after(response))
+            if attempt + 1 == self.POLICY.MAX_ATTEMPTS:
+                break
+
+            delay = self.POLICY.delay(attempt, response)
+            reason = error if error is not None else f"status {response.status_code}"
+            logging.error(
+                f"Request to {endpoint} failed ({reason}). "
+                f"Retrying {attempt + 1}/{self.POLICY.MAX_ATTEMPTS - 1} in {delay:.1f}s."
+            )
+            self.STATS.add(endpoint, retries=1, backoff_s=delay)
+            time.sleep(delay)
+
+        self.STATS.add(endpoint, failures=1)
+        logging.warning(f"All attempts failed. Unable to make successful request to {endpoint}.")
         return None
 
-    return wrapper
+
+class SeriesStore:
+    """Local SQLite store of every scraped point, keyed by (brand, model, data_date)."""
+
+    def __init__(self, path=STORE_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS points (
+                brand TEXT NOT NULL,
+                model TEXT NOT NULL,
+                data_date TEXT NOT NULL,
+                value REAL,
+                scrape_datetime TEXT NOT NULL,
+                PRIMARY KEY (brand, model, data_date)
+            )
+            """
+        )
+
+    def last_date(self, brand, model):
+        """Latest stored data_date for a series, or None if the series has never been scraped."""
+        row = self.connection.execute(
+            "SELECT MAX(data_date) FROM points WHERE brand = ? AND model = ?", (brand, model)
+        ).fetchone()
+        return datetime.strptime(row[0], "%Y-%m-%d").date() if row and row[0] else None
+
+    def upsert(self, rows):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO points (brand, model, data_date, value, scrape_datetime) VALUES (?, ?, ?, ?, ?)",
+                [(row["brand"], row["model"], row["data_date"], row["value"], row["scrape_datetime"]) for row in rows],
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+class Catalogue:
+    """Brand → series catalogue in the `brands.json` shape, indexed by id and by name."""
+
+    def __init__(self, brands):
+        self.BRANDS = brands
+        self.BY_BRAND = {}
+        self.BY_SERIES = {}
+        for brand in brands:
+            self.BY_BRAND[str(brand["outter_brand_id"])] = brand
+            self.BY_BRAND[brand["outter_brand_name"]] = brand
+            for series in brand["series"]:
+                if series["series_id"] == -1:
+                    continue  # 全部车型 exists for every brand, so it is not a unique key
+                self.BY_SERIES[str(series["series_id"])] = (brand, series)
+                self.BY_SERIES[series["series_name"]] = (brand, series)
+
+    def __len__(self):
+        return sum(len(brand["series"]) for brand in self.BRANDS)
+
+    def brand(self, key):
+        """Brand entry by outter_brand_id or name, or None."""
+        return self.BY_BRAND.get(str(key))
+
+    def series(self, key):
+        """(brand, series) entries by series_id or name, or None."""
+        return self.BY_SERIES.get(str(key))
+
+    def filter(self, brands=None, series=None):
+        """Sub-catalogue restricted to the given brand and/or series ids or names."""
+        selected = {}
+        for key in brands or []:
+            brand = self.brand(key)
+            if brand is None:
+                logging.warning(f"⚠ Brand {key} is not in the catalogue")
+                continue
+            selected[brand["outter_brand_id"]] = dict(brand)
+        for key in series or []:
+            match = self.series(key)
+            if match is None:
+                logging.warning(f"⚠ Series {key} is not in the catalogue")
+                continue
+            brand, entry = match
+            picked = selected.setdefault(brand["outter_brand_id"], dict(brand, series=[]))
+            if entry not in picked["series"]:
+                picked["series"].append(entry)
+        return Catalogue(list(selected.values()))
+
+
+class RunJournal:
+    """SQLite journal of finished (window, brand, series) units and the rows each returned.
+
+    Writes are committed every `checkpoint_every` units, so a crash loses at most that
+    much work. A fresh run starts a new journal; `resume` keeps the existing one.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, resume=False, checkpoint_every=CHECKPOINT_EVERY):
+        self.PATH = path
+        self.CHECKPOINT_EVERY = checkpoint_every
+        if not resume and os.path.exists(path):
+            finished = self.count_units(path)
+            if finished:
+                logging.warning(f"⚠ Discarding journal {path} with {finished} finished units; pass --resume to continue it")
+            os.remove(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS units (
+                brand_id INTEGER, series_id INTEGER, start_date TEXT, end_date TEXT,
+                PRIMARY KEY (brand_id, series_id, start_date, end_date)
+            );
+            CREATE TABLE IF NOT EXISTS rows (
+                brand_id INTEGER, series_id INTEGER, start_date TEXT, end_date TEXT,
+                scrape_datetime TEXT, data_date TEXT, brand TEXT, model TEXT, value REAL
+            );
+            CREATE INDEX IF NOT EXISTS rows_unit ON rows (brand_id, series_id, start_date, end_date);
+            """
+        )
+        self.COMPLETED = set(self.connection.execute("SELECT brand_id, series_id, start_date, end_date FROM units"))
+        self.pending = 0
+
+    @staticmethod
+    def count_units(path):
+        """Finished units in an existing journal file, 0 if it cannot be read."""
+        try:
+            connection = sqlite3.connect(path)
+            try:
+                return connection.execute("SELECT COUNT(*) FROM units").fetchone()[0]
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            return 0
+
+    @staticmethod
+    def unit_key(unit):
+        return unit[0], unit[2], unit[4], unit[5]
+
+    def get_meta(self, key):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+        self.connection.commit()
+
+    def record(self, unit, rows):
+        key = self.unit_key(unit)
+        self.connection.executemany(
+            "INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [key + (row["scrape_datetime"], row["data_date"], row["brand"], row["model"], row["value"]) for row in rows],
+        )
+        self.connection.execute("INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?)", key)
+        self.COMPLETED.add(key)
+        self.pending += 1
+        if self.pending >= self.CHECKPOINT_EVERY:
+            self.checkpoint()
+
+    def rows(self, unit):
+        """Stream a completed unit's rows back in the order they were fetched."""
+        cursor = self.connection.execute(
+            "SELECT scrape_datetime, data_date, brand, model, value FROM rows "
+            "WHERE brand_id = ? AND series_id = ? AND start_date = ? AND end_date = ? ORDER BY rowid",
+            self.unit_key(unit),
+        )
+        for scrape_datetime, data_date, brand, model, value in cursor:
+            yield {"scrape_datetime": scrape_datetime, "data_date": data_date, "brand": brand, "model": model, "value": value}
+
+    def checkpoint(self):
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self):
+        self.checkpoint()
+        self.connection.close()
+
+    def discard(self):
+        """Remove the journal once the final output has been written."""
+        if os.path.exists(self.PATH):
+            os.remove(self.PATH)
+
+
+class SeriesColumns:
+    """Columnar accumulator for scraped points.
+
+    Each (brand, model) series keeps its dates as int32 days since 1970-01-01, its values
+    as float64 and its scrape_datetime as a uint16 code into SCRAPE_TIMES (rows replayed
+    from a journal keep their original one). Overlapping windows append some dates twice;
+    the first occurrence is kept when the output is written, so no per-point Python
+    objects are kept while scraping.
+    """
+
+    EPOCH = date(1970, 1, 1).toordinal()
+
+    def __init__(self):
+        self.SERIES = {}
+        self.SCRAPE_TIMES = {}
+
+    def __len__(self):
+        return sum(len(np.unique(np.frombuffer(dates, dtype=np.int32))) for dates, _, _ in self.SERIES.values())
+
+    def extend(self, rows):
+        for row in rows:
+            key = (row["brand"], row["model"])
+            columns = self.SERIES.get(key)
+            if columns is None:
+                columns = self.SERIES[key] = (array("i"), array("d"), array("H"))
+            columns[0].append(date.fromisoformat(row["data_date"]).toordinal() - self.EPOCH)
+            columns[1].append(np.nan if row["value"] is None else float(row["value"]))
+            columns[2].append(self.SCRAPE_TIMES.setdefault(row["scrape_datetime"], len(self.SCRAPE_TIMES)))
+
+    def columns(self):
+        """Concatenated columns, each series sorted by date with repeated dates dropped:
+        (dates, values, scrape codes, brand codes, model codes, scrape times, brands, models)."""
+        brands = {brand: code for code, brand in enumerate(dict.fromkeys(brand for brand, _ in self.SERIES))}
+        models = {model: code for code, model in enumerate(dict.fromkeys(model for _, model in self.SERIES))}
+        dates, values, scrape_codes, brand_codes, model_codes = [], [], [], [], []
+        for (brand, model), (series_dates, series_values, series_scrapes) in self.SERIES.items():
+            series_dates = np.frombuffer(series_dates, dtype=np.int32)
+            order = np.argsort(series_dates, kind="stable")
+            _, first = np.unique(series_dates[order], return_index=True)  # Stable sort: first fetched wins
+            order = order[first]
+            dates.append(series_dates[order])
+            values.append(np.frombuffer(series_values, dtype=np.float64)[order])
+            scrape_codes.append(np.frombuffer(series_scrapes, dtype=np.uint16)[order].astype(np.int32))
+            brand_codes.append(np.full(len(order), brands[brand], dtype=np.int32))
+            model_codes.append(np.full(len(order), models[model], dtype=np.int32))
+
+        def concat(parts, dtype):
+            return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+        return (concat(dates, np.int32), concat(values, np.float64), concat(scrape_codes, np.int32),
+                concat(brand_codes, np.int32), concat(model_codes, np.int32),
+                list(self.SCRAPE_TIMES), list(brands), list(models))
+
+    def to_csv(self, filename):
+        dates, values, scrape_codes, brand_codes, model_codes, scrape_times, brands, models = self.columns()
+        df = pd.DataFrame({
+            "scrape_datetime": pd.Categorical.from_codes(scrape_codes, scrape_times),
+            "data_date": np.datetime_as_string(dates.astype("datetime64[D]"), unit="D"),
+            "brand": pd.Categorical.from_codes(brand_codes, brands),
+            "model": pd.Categorical.from_codes(model_codes, models),
+            "value": values,
+        })
+        df.to_csv(filename, encoding="utf-8", quotechar='"', quoting=csv.QUOTE_ALL, index=False)
+
+    def to_parquet(self, filename):
+        if pa is None:
+            raise ImportError("pyarrow is required for Parquet output.")
+        dates, values, scrape_codes, brand_codes, model_codes, scrape_times, brands, models = self.columns()
+        table = pa.table({
+            "scrape_datetime": pa.DictionaryArray.from_arrays(scrape_codes, pa.array(scrape_times, type=pa.string())),
+            "data_date": pa.array(dates, type=pa.int32()).cast(pa.date32()),
+            "brand": pa.DictionaryArray.from_arrays(brand_codes, pa.array(brands)),
+            "model": pa.DictionaryArray.from_arrays(model_codes, pa.array(models)),
+            "value": pa.array(values, type=pa.float64(), from_pandas=True),
+        })
+        pq.write_table(table, filename)
+
+    def write(self, filename):
+        """Write to Parquet when `filename` ends in .parquet, otherwise to CSV in the usual format."""
+        if filename.endswith(".parquet"):
+            self.to_parquet(filename)
+        else:
+            self.to_csv(filename)
 
 
 class Scraper:
-    def __init__(self, historical=False):
+    def __init__(self, historical=False, concurrent=False, max_workers=MAX_WORKERS, rate=None,
+                 rank_type_cache=RANK_TYPE_CACHE_FILE, rank_type_ttl=RANK_TYPE_TTL,
+                 incremental=False, backfill=False, store_file=STORE_FILE, fixed_windows=False,
+                 batch_size=BATCH_SIZE, columnar=False, max_attempts=MAX_ATTEMPTS, stats_file=None,
+                 journal_file=JOURNAL_FILE, resume=False, discover=False, catalogue_cache=CATALOGUE_CACHE_FILE,
+                 catalogue_ttl=CATALOGUE_TTL, brands=None, series=None, shard=None):
         self.MASTER_LIST = []
+        self.COLUMNS = SeriesColumns() if columnar else None
+        self.BATCH_SIZE = max(1, batch_size)
+        self.SEEN = set()
+        self.ADAPTIVE_WINDOWS = not fixed_windows
+        self.WINDOW_DAYS = WINDOW_DAYS
+        self.ANCHOR = (SCRAPE_DATETIME - timedelta(days=1)).date()  # Yesterday; every window runs back from it
+        self.WINDOWS = None  # (start, end) dates chained by the window planner
+        self.PREFETCHED = {}
+        self.INCREMENTAL = incremental
+        self.BACKFILL = backfill
+        self.STORE = SeriesStore(store_file) if incremental else None
+        self.RESUME = resume
+        self.DISCOVER = discover
+        self.CATALOGUE_CACHE = catalogue_cache
+        self.CATALOGUE_TTL = catalogue_ttl
+        self.BRAND_FILTER = brands
+        self.SERIES_FILTER = series
+        self.CATALOGUE = None
+        self.SHARD = shard
+        self.RANK_TYPE_CACHE = rank_type_cache
+        self.RANK_TYPE_TTL = rank_type_ttl
+        self.RANK_TYPES = {}
         self.HISTORICAL = historical
+        self.CONCURRENT = concurrent
+        self.MAX_WORKERS = max_workers
+        # Every request, sequential or pooled, goes through one token bucket, breaker and retry policy.
+        self.LIMITER = RateLimiter(rate or REQUESTS_PER_SECOND, burst=max(BURST, max_workers))
+        self.STATS = EndpointStats()
+        self.STATS_FILE = stats_file
+        self.RETRY = RetryEngine(RetryPolicy(max_attempts=max_attempts), self.LIMITER, CircuitBreaker(), self.STATS)
         self.CLIENT = self.make_session()
         self.setup_logging()
+        if shard and journal_file:
+            journal_file = shard_filename(journal_file, shard)  # Shards on one machine keep separate journals
+        self.JOURNAL = RunJournal(journal_file, resume=resume) if journal_file else None
 
     def setup_logging(self):
         """Sets up logging configuration."""
@@ -61,7 +629,10 @@ class Scraper:
             level=logging.INFO,
             datefmt="%d-%b-%y %H:%M:%S",
         )
-        logging.info(f"STARTING SCRAPE... {JOB_NAME} | HISTORICAL: {self.HISTORICAL}")
+        logging.info(
+            f"STARTING SCRAPE... {JOB_NAME} | HISTORICAL: {self.HISTORICAL} | CONCURRENT: {self.CONCURRENT} | "
+            f"INCREMENTAL: {self.INCREMENTAL} | BACKFILL: {self.BACKFILL}"
+        )
         time.sleep(2)
 
     def make_session(self, headers=None):
@@ -75,10 +646,9 @@ class Scraper:
         session.headers.update(headers or default_headers)
         return session
 
-    @retry_on_failure
     def make_request(self, url, params=None):
-        """Performs an HTTP GET request."""
-        return self.CLIENT.get(url, params=params, timeout=60)
+        """Performs an HTTP GET request through the retry engine; returns None if it never succeeds."""
+        return self.RETRY.request(urlsplit(url).path, lambda: self.CLIENT.get(url, params=params, timeout=60))
     
     def get_rank_type(self, brand_id, series_id):
         params = {
@@ -86,9 +656,9 @@ class Scraper:
             'series_id': series_id,
         }
         try:
-            response = self.CLIENT.get("https://index.dongchedi.com/dzx_index/menu/rank_type", 
-                                       params=params,  timeout=30)
-            if response.status_code == 200:
+            url = "https://index.dongchedi.com/dzx_index/menu/rank_type"
+            response = self.RETRY.request(urlsplit(url).path, lambda: self.CLIENT.get(url, params=params, timeout=30))
+            if response is not None:
                 data = response.json()
                 if data.get("status") == 0 and "menu" in data.get("data", {}):
                     menu_list = data["data"]["menu"]
@@ -102,13 +672,60 @@ class Scraper:
                 else:
                     logging.error("Invalid response format.")
             else:
-                logging.error(f"Request failed with status code: {response.status_code}")
+                logging.error(f"Rank type request failed for {brand_id} - {series_id}")
         except Exception as e:
             logging.error(f"Error fetching rank type: {e}")
 
+    def resolve_rank_types(self, pairs):
+        """Resolve the rank type of every (brand_id, series_id) pair once, before any trend request.
+
+        Fresh entries come from the on-disk cache; the rest are fetched concurrently and
+        written back. Pairs whose lookup fails are not cached and fall back to a live call.
+        """
+        cache = {}
+        if self.RANK_TYPE_CACHE and os.path.exists(self.RANK_TYPE_CACHE):
+            with open(self.RANK_TYPE_CACHE, "r", encoding="utf-8") as file:
+                cache = json.load(file)
+
+        now = time.time()
+        pairs = list(dict.fromkeys(pairs))
+        missing = []
+        for brand_id, series_id in pairs:
+            entry = cache.get(f"{brand_id}:{series_id}")
+            if entry and now - entry["fetched_at"] < self.RANK_TYPE_TTL:
+                self.RANK_TYPES[(brand_id, series_id)] = entry["rank_type"]
+            else:
+                missing.append((brand_id, series_id))
+
+        logging.info(f"Rank types: {len(pairs) - len(missing)} cached, {len(missing)} to fetch")
+        if not missing:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            rank_types = list(executor.map(lambda pair: self.get_rank_type(*pair), missing))
+
+        for (brand_id, series_id), rank_type in zip(missing, rank_types):
+            if rank_type is None:
+                continue
+            self.RANK_TYPES[(brand_id, series_id)] = rank_type
+            cache[f"{brand_id}:{series_id}"] = {"rank_type": rank_type, "fetched_at": now}
+
+        if self.RANK_TYPE_CACHE:
+            os.makedirs(os.path.dirname(self.RANK_TYPE_CACHE) or ".", exist_ok=True)
+            with open(self.RANK_TYPE_CACHE, "w", encoding="utf-8") as file:
+                json.dump(cache, file, ensure_ascii=False, indent=2)
+
     def fetch_full_year_data(self, brand_id, brand_name, series_id, series_name, start_date, end_date):
         """Fetches data for the given date range and processes all available dates."""
-        rank_type = self.get_rank_type(brand_id, series_id)
+        self.MASTER_LIST.extend(
+            self.fetch_series_rows(brand_id, brand_name, series_id, series_name, start_date, end_date)
+        )
+
+    def fetch_series_rows(self, brand_id, brand_name, series_id, series_name, start_date, end_date):
+        """Fetches one series for the given date range and returns its rows."""
+        rank_type = self.RANK_TYPES.get((brand_id, series_id))
+        if rank_type is None:
+            rank_type = self.get_rank_type(brand_id, series_id)
 
         params = {
             "date": end_date,  # Fetch the latest available data (up to yesterday)
@@ -123,7 +740,7 @@ class Scraper:
 
         if not response:
             logging.error(f"❌ Request failed for {start_date} to {end_date} - {brand_name} - {series_name}")
-            return
+            return []
 
         data = response.json()
 
@@ -132,16 +749,25 @@ class Scraper:
 
         if not chart_data or not x_axis:
             logging.warning(f"⚠ No data found for {start_date} to {end_date} - {brand_name} - {series_name}")
-            return
+            return []
 
-        values = chart_data[0].get("value", [])
+        rows = self.series_rows(x_axis, chart_data[0].get("value", []), brand_name, series_name, start_date, end_date)
+        if rows:
+            logging.info(f"✅ Data from {start_date} to {end_date} for {brand_name} - {series_name} saved successfully.")
+        return rows
 
+    def series_rows(self, x_axis, values, brand_name, series_name, start_date, end_date):
+        """Pair one series' values with the shared `x_axis` dates."""
         if len(x_axis) != len(values):
             logging.error(f"❌ Mismatch in date-value lengths for {start_date} to {end_date} - {brand_name} - {series_name}")
-            return
+            return []
+        if x_axis and min(x_axis) > start_date:
+            logging.warning(f"⚠ Trend call for {start_date} to {end_date} - {brand_name} - {series_name} "
+                            f"only reaches back to {min(x_axis)}; earlier days are missing")
 
+        rows = []
         for i in range(len(x_axis)):
-            self.MASTER_LIST.append(
+            rows.append(
                 {
                     "scrape_datetime": SCRAPE_DATETIME.isoformat(),
                     "data_date": x_axis[i],  # Capture all available dates
@@ -150,64 +776,490 @@ class Scraper:
                     "value": values[i],
                 }
             )
+        return rows
+
+    def fetch_batch_rows(self, units):
+        """Fetch several series sharing one window and rank type in a single trend call.
+
+        `chart_data` entries are matched back to their series by `id`, or, when the response
+        carries no ids, by the `name` each series was requested under (unique within a
+        batch, see `batch_units`). Entry order is never trusted. Series the response does
+        not account for (e.g. beyond what the endpoint accepts per call) are fetched one by
+        one, so a batch never loses or misassigns data.
+        """
+        if len(units) == 1:
+            return [self.fetch_unit(units[0])]
+
+        brand_id, brand_name, series_id, series_name, start_date, end_date = units[0]
+        ids = [str(unit[2] if unit[2] != -1 else unit[0]) for unit in units]
+        params = {
+            "date": end_date,
+            "province": "全国",
+            "rank_type": self.RANK_TYPES.get((brand_id, series_id)),
+            "sub_rank_type": "",
+            "id_list": ",".join(ids),
+            "name_list": ",".join(unit[1] for unit in units),
+        }
 
-        logging.info(f"✅ Data from {start_date} to {end_date} for {brand_name} - {series_name} saved successfully.")
-
-
-
-    def generate_years_list(self):
-        """Generates a list of date ranges, scraping one year at a time until 2021-01-01."""
+        response = self.make_request(BASE_URL, params=params)
+        data = (response.json().get("data") or {}) if response else {}
+        x_axis = data.get("x_axis", [])
+        chart_data = data.get("chart_data") or []
+
+        by_id = {str(entry.get("id")): entry for entry in chart_data if entry.get("id") is not None}
+        if not all(series_id in by_id for series_id in ids):
+            by_name = {entry.get("name"): entry for entry in chart_data}
+            if len(by_name) != len(chart_data):
+                by_name = {}  # Repeated names cannot tell entries apart
+            by_id = {series_id: by_name[unit[1]] for unit, series_id in zip(units, ids) if unit[1] in by_name}
+
+        results = []
+        for unit, series_id in zip(units, ids):
+            entry = by_id.get(series_id)
+            if entry is None or not x_axis:
+                results.append(self.fetch_series_rows(*unit))
+                continue
+            results.append(self.series_rows(x_axis, entry.get("value", []), unit[1], unit[3], unit[4], unit[5]))
+
+        logging.info(f"✅ Data from {start_date} to {end_date} for {len(units)} series saved successfully.")
+        return results
+
+    def batch_units(self, units):
+        """Group work units that can share a trend call: same window and rank type, at most BATCH_SIZE each.
+
+        A batch never holds two units requested under the same `name_list` entry (the brand
+        name), so a response without ids can still be matched back by name.
+        """
+        batches, groups = [], {}
+        for unit in units:
+            if (unit[0], unit[2], unit[5]) in self.PREFETCHED:
+                batches.append([unit])  # Already fetched by the window planner
+                continue
+            key = (unit[4], unit[5], self.RANK_TYPES.get((unit[0], unit[2])))
+            groups.setdefault(key, []).append(unit)
+
+        for key, group in groups.items():
+            size = self.BATCH_SIZE if key[2] is not None else 1
+            open_batches = []
+            for unit in group:
+                batch = next((batch for batch in open_batches if all(other[1] != unit[1] for other in batch)), None)
+                if batch is None:
+                    batch = []
+                    open_batches.append(batch)
+                    batches.append(batch)
+                batch.append(unit)
+                if len(batch) == size:
+                    open_batches.remove(batch)
+        return batches
+
+
+    def generate_years_list(self, final_date=HISTORY_START):
+        """Generates a list of date ranges from yesterday back to `final_date` (2021-01-01).
+
+        Uses the planner's windows when it ran, otherwise `WINDOW_DAYS` days at a time.
+        """
         dates_list = []
-        end_date = (SCRAPE_DATETIME - timedelta(days=1)).date()  # Start from yesterday
-        final_date = datetime(2021, 1, 1).date()  # Stop at 2021-01-01
+        for start_date, end_date in self.WINDOWS or self.fixed_windows(self.ANCHOR):
+            if end_date < final_date:
+                break
 
-        while end_date >= final_date:
-            start_date = end_date - timedelta(days=365)  # Move one year back
-
-            # Ensure we don't go before 2021-01-01
+            # Ensure we don't go before `final_date`
             if start_date < final_date:
                 start_date = final_date
 
             dates_list.append({"start_date": start_date.strftime("%Y-%m-%d"), "end_date": end_date.strftime("%Y-%m-%d")})
-            end_date = start_date - timedelta(days=1)  # Move to previous period
 
         return dates_list
 
-
-
-    def scrape_data(self):
-        """Loops through all years and ensures we capture all available dates up to 2021-01-01."""
-        json_path = os.path.join(os.path.dirname(__file__), "brands.json")
-
-        with open(json_path, "r", encoding="utf-8") as file:
-            BRANDS_DATA = json.load(file)
-
+    def fixed_windows(self, end_date):
+        """(start, end) dates `WINDOW_DAYS` days at a time from `end_date` back to 2021-01-01."""
+        windows = []
+        while end_date >= HISTORY_START:
+            start_date = max(end_date - timedelta(days=self.WINDOW_DAYS - 1), HISTORY_START)  # Move one window back
+            windows.append((start_date, end_date))
+            end_date = start_date - timedelta(days=1)  # Move to previous period
+        return windows
+
+    def plan_windows(self, brands):
+        """Chain the date windows from what each trend call actually returns.
+
+        The endpoint ignores the start date: a call for `date` returns every day from the 1st
+        of the same month a year earlier (367-369 days in the bundled sample), so the span
+        depends on the end date. One series is probed window by window, each next window
+        ending the day before the earliest date the previous call returned, which leaves no
+        gaps whatever the span. The probe's rows are kept for the units they belong to
+        instead of being refetched. If a probe fails, the rest of the history falls back to
+        fixed `WINDOW_DAYS` windows.
+        """
+        brand = next(brand for brand in brands if brand["series"])
+        series = brand["series"][0]
+        windows = []
+        end_date = self.ANCHOR
+        while end_date >= HISTORY_START:
+            end = end_date.strftime("%Y-%m-%d")
+            rows = self.fetch_series_rows(
+                brand["outter_brand_id"], brand["outter_brand_name"],
+                series["series_id"], series["series_name"], end, end,
+            )
+            first = min((row["data_date"] for row in rows), default=None)
+            if first is None or first > end:
+                logging.warning(f"⚠ Window probe for {end} returned no data, using {self.WINDOW_DAYS}-day windows from there")
+                windows.extend(self.fixed_windows(end_date))
+                break
+
+            start_date = max(datetime.strptime(first, "%Y-%m-%d").date(), HISTORY_START)
+            windows.append((start_date, end_date))
+            self.PREFETCHED[(brand["outter_brand_id"], series["series_id"], end)] = rows
+            end_date = start_date - timedelta(days=1)
+
+        self.WINDOWS = windows
+        logging.info(f"WINDOW PLANNER: {len(windows)} windows back to {HISTORY_START} "
+                     f"(fixed {self.WINDOW_DAYS}-day windows need {len(self.fixed_windows(self.ANCHOR))})")
+
+    def load_brands(self):
+        """The brand → series list to scrape: discovered (or the cached discovery) with --discover,
+        otherwise `brands.json`, narrowed by any --brand/--series filters."""
+        brands = self.load_catalogue() if self.DISCOVER else None
+        if brands is None:
+            json_path = os.path.join(os.path.dirname(__file__), "brands.json")
+            with open(json_path, "r", encoding="utf-8") as file:
+                brands = json.load(file)
+
+        self.CATALOGUE = Catalogue(brands)
+        if self.BRAND_FILTER or self.SERIES_FILTER:
+            self.CATALOGUE = self.CATALOGUE.filter(self.BRAND_FILTER, self.SERIES_FILTER)
+        logging.info(f"CATALOGUE: {len(self.CATALOGUE.BRANDS)} brands, {len(self.CATALOGUE)} series")
+        return self.CATALOGUE.BRANDS
+
+    def load_catalogue(self):
+        """Cached catalogue while it is younger than the TTL, otherwise a fresh discovery."""
+        if self.CATALOGUE_CACHE and os.path.exists(self.CATALOGUE_CACHE):
+            with open(self.CATALOGUE_CACHE, "r", encoding="utf-8") as file:
+                cached = json.load(file)
+            if time.time() - cached["fetched_at"] < self.CATALOGUE_TTL:
+                return cached["brands"]
+
+        brands = self.discover_catalogue()
+        if not brands:
+            logging.warning("⚠ Catalogue discovery failed, falling back to brands.json")
+            return None
+
+        if self.CATALOGUE_CACHE:
+            os.makedirs(os.path.dirname(self.CATALOGUE_CACHE) or ".", exist_ok=True)
+            with open(self.CATALOGUE_CACHE, "w", encoding="utf-8") as file:
+                json.dump({"fetched_at": time.time(), "brands": brands}, file, ensure_ascii=False, indent=2)
+        return brands
+
+    def discover_catalogue(self):
+        """Crawl the brand menu, then every brand's series menu concurrently.
+
+        Any menu response that is not in the expected shape fails the whole discovery, so
+        a partial or misread catalogue is never cached in place of `brands.json`.
+        """
+        brands = self.menu_items(BRAND_MENU_URL, ("outter_brand_id", "outter_brand_name"))
+        if not brands:
+            return []
+
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            menus = list(executor.map(
+                lambda brand: self.menu_items(
+                    SERIES_MENU_URL, ("series_id", "series_name"), {"outter_brand_id": brand["outter_brand_id"]}
+                ),
+                brands,
+            ))
+
+        for brand, items in zip(brands, menus):
+            if items is None:
+                logging.error(f"❌ Series menu failed for {brand['outter_brand_name']}, discarding the discovery")
+                return []
+            brand["series"] = [dict(ALL_SERIES)] + [item for item in items if item["series_id"] != ALL_SERIES["series_id"]]
+
+        logging.info(f"Discovered {len(brands)} brands, {sum(len(brand['series']) for brand in brands)} series")
+        return brands
+
+    def menu_items(self, url, fields, params=None):
+        """Entries of a menu endpoint as `{id_field, name_field}` dicts, or None if the call fails.
+
+        The response must be `{"status": 0, "data": [{id_field: int, name_field: str, ...}, ...]}`,
+        with the same field names `brands.json` uses; anything else is rejected.
+        """
+        response = self.make_request(url, params=params)
+        if not response:
+            return None
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        items = data.get("data") if isinstance(data, dict) and data.get("status") == 0 else None
+
+        id_field, name_field = fields
+        if not isinstance(items, list) or not all(
+            isinstance(item, dict)
+            and type(item.get(id_field)) is int
+            and isinstance(item.get(name_field), str) and item[name_field]
+            for item in items
+        ):
+            logging.error(f"❌ Unexpected menu response from {url}")
+            return None
+        return [{id_field: item[id_field], name_field: item[name_field]} for item in items]
+
+    def series_windows(self, brand_name, series_name, years):
+        """Date windows still to fetch for one series.
+
+        Incremental runs only cover the days after the last stored point; everything
+        else (and --backfill) uses the full history windows.
+        """
+        if not self.INCREMENTAL or self.BACKFILL:
+            return years
+        last_date = self.STORE.last_date(brand_name, series_name)
+        if last_date is None:
+            return years
+        return self.generate_years_list(final_date=last_date + timedelta(days=1))
+
+    def work_units(self, BRANDS_DATA=None):
+        """Every (date window, brand, series) fetch in the order the sequential loop visits them."""
+        if BRANDS_DATA is None:
+            BRANDS_DATA = self.load_brands()
         years = self.generate_years_list()  # Get all year periods (2025 → 2024 → 2023 → ... → 2021)
 
-        for year_range in years:
-            start_date = year_range["start_date"]
-            end_date = year_range["end_date"]
+        windows = {}
+        for brand in BRANDS_DATA:
+            for series in brand["series"]:
+                key = (brand["outter_brand_name"], series["series_name"])
+                windows[key] = self.series_windows(*key, years)
 
+        units = []
+        for index in range(max((len(w) for w in windows.values()), default=0)):
             for brand in BRANDS_DATA:
-                brand_name = brand["outter_brand_name"]
-                brand_id = brand["outter_brand_id"]
-
                 for series in brand["series"]:
-                    series_id = series["series_id"]
-                    series_name = series["series_name"]
-
-                    self.fetch_full_year_data(brand_id, brand_name, series_id, series_name, start_date, end_date)
+                    series_years = windows[(brand["outter_brand_name"], series["series_name"])]
+                    if index >= len(series_years):
+                        continue
+                    units.append((
+                        brand["outter_brand_id"],
+                        brand["outter_brand_name"],
+                        series["series_id"],
+                        series["series_name"],
+                        series_years[index]["start_date"],
+                        series_years[index]["end_date"],
+                    ))
+        return units
 
+    def scrape_data(self):
+        """Loops through all years and ensures we capture all available dates up to 2021-01-01."""
+        BRANDS_DATA = self.load_brands()
+        if self.SHARD:
+            total = sum(len(brand["series"]) for brand in BRANDS_DATA)
+            BRANDS_DATA = [
+                dict(brand, series=[series for series in brand["series"] if self.in_shard(brand, series)])
+                for brand in BRANDS_DATA
+            ]
+            logging.info(f"SHARD {self.SHARD[0] + 1}/{self.SHARD[1]}: "
+                         f"{sum(len(brand['series']) for brand in BRANDS_DATA)} of {total} series")
+        if not any(brand["series"] for brand in BRANDS_DATA):
+            logging.error("NO DATA: no series selected")
+            return
+        self.resolve_rank_types([
+            (brand["outter_brand_id"], series["series_id"]) for brand in BRANDS_DATA for series in brand["series"]
+        ])
+        window_days = self.JOURNAL.get_meta("window_days") if self.JOURNAL and self.RESUME else None
+        if window_days is not None:
+            # Same windows as the interrupted run, even when it started before a UTC midnight
+            self.WINDOW_DAYS = int(window_days)
+            self.ANCHOR = date.fromisoformat(self.JOURNAL.get_meta("anchor") or self.ANCHOR.isoformat())
+            windows = self.JOURNAL.get_meta("windows")
+            if windows:
+                self.WINDOWS = [tuple(date.fromisoformat(day) for day in window) for window in json.loads(windows)]
+        elif self.ADAPTIVE_WINDOWS and not (self.INCREMENTAL and not self.BACKFILL):
+            # Incremental runs only fetch the last few days, which any single window covers.
+            self.plan_windows(BRANDS_DATA)
+        if self.JOURNAL is not None:
+            self.JOURNAL.set_meta("window_days", self.WINDOW_DAYS)
+            self.JOURNAL.set_meta("anchor", self.ANCHOR.isoformat())
+            if self.WINDOWS:
+                self.JOURNAL.set_meta("windows", json.dumps([[start.isoformat(), end.isoformat()] for start, end in self.WINDOWS]))
+        units = self.work_units(BRANDS_DATA)
+
+        for unit, rows in self.unit_rows(units):
+            self.collect_rows(unit, rows)
+
+        points = len(self.COLUMNS) if self.COLUMNS is not None else len(self.SEEN)
+        logging.info(f"FETCHED {len(units)} windows, {points} unique points")
+
+    def in_shard(self, brand, series):
+        """Stable brand × series partition: a series and all of its windows land in the same shard on every machine.
+
+        Windows are left out of the key because each shard plans them from its own "yesterday"
+        and probe, so shards started on different days would not agree on them.
+        """
+        index, count = self.SHARD
+        return zlib.crc32(f"{brand['outter_brand_id']}:{series['series_id']}".encode()) % count == index
+
+    def unit_rows(self, units):
+        """Yield (unit, rows) in unit order: journaled units are replayed, the rest fetched and journaled."""
+        done = self.JOURNAL.COMPLETED if self.JOURNAL is not None else set()
+        pending = [unit for unit in units if RunJournal.unit_key(unit) not in done]
+        if self.RESUME:
+            logging.info(f"RESUME: {len(units) - len(pending)} of {len(units)} units already in the journal")
+
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            if self.BATCH_SIZE > 1:
+                fetched = iter(self.fetch_batches(pending, executor))
+            elif self.CONCURRENT:
+                # map() yields results in submission order, so MASTER_LIST matches the sequential run.
+                fetched = executor.map(self.fetch_unit, pending)
+            else:
+                fetched = map(self.fetch_unit, pending)
+
+            for unit in units:
+                if RunJournal.unit_key(unit) in done:
+                    yield unit, self.JOURNAL.rows(unit)
+                    continue
+                rows = next(fetched)
+                if rows and self.JOURNAL is not None:
+                    self.JOURNAL.record(unit, rows)
+                yield unit, rows
+
+    def fetch_batches(self, units, executor):
+        """Fetch units in multi-series batches; returns their rows in unit order."""
+        batches = self.batch_units(units)
+        if self.CONCURRENT:
+            fetched = executor.map(self.fetch_batch_rows, batches)
+        else:
+            fetched = map(self.fetch_batch_rows, batches)
+
+        results = {}
+        for batch, batch_rows in zip(batches, fetched):
+            results.update(zip(batch, batch_rows))
+        return [results[unit] for unit in units]
+
+    def fetch_unit(self, unit):
+        """Rows for one work unit, reusing the window planner's probe when it covered this unit."""
+        rows = self.PREFETCHED.pop((unit[0], unit[2], unit[5]), None)
+        if rows is not None:
+            return rows
+        return self.fetch_series_rows(*unit)
+
+    def collect_rows(self, unit, rows):
+        """Add a unit's rows to MASTER_LIST; incremental runs keep only the requested window and store them.
+
+        Windows can overlap at their edges, so dates already seen for a series are dropped here
+        (columnar runs drop them inside SeriesColumns instead).
+        """
+        if self.STORE is not None:
+            start_date = unit[4]
+            rows = [row for row in rows if row["data_date"] >= start_date]
+        if self.COLUMNS is None or self.STORE is not None:
+            rows = [row for row in rows if self.first_seen(row)]
+        if self.STORE is not None:
+            self.STORE.upsert(rows)
+        if self.COLUMNS is not None:
+            self.COLUMNS.extend(rows)
+        else:
+            self.MASTER_LIST.extend(rows)
+
+    def first_seen(self, row):
+        key = (row["brand"], row["model"], row["data_date"])
+        if key in self.SEEN:
+            return False
+        self.SEEN.add(key)
+        return True
 
     def start_scraper(self):
         """Runs the scraper"""
-        self.scrape_data()
-
+        try:
+            self.scrape_data()
+        finally:
+            if self.JOURNAL is not None:
+                self.JOURNAL.close()
+        if self.STORE is not None:
+            self.STORE.close()
+            logging.info(f"INCREMENTAL: {len(self.SEEN)} new points stored")
+        self.STATS.log_summary()
+        if self.STATS_FILE:
+            self.STATS.save(self.STATS_FILE)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Scrape Dongchedi Index Data.')
+    parser.add_argument('filename', type=str, nargs='?', default=output_filename,
+                        help=f'Output filename for scraped data (default: {output_filename}).')
+    parser.add_argument('--concurrent', action='store_true',
+                        help='Fetch series with a thread pool sharing one rate limiter.')
+    parser.add_argument('--workers', dest='max_workers', type=int, default=MAX_WORKERS,
+                        help=f'Thread pool size for concurrent mode (default: {MAX_WORKERS}).')
+    parser.add_argument('--rate', type=float, default=None,
+                        help=f'Requests/sec across all workers (default: {REQUESTS_PER_SECOND}).')
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS,
+                        help=f'Attempts per request before giving up (default: {MAX_ATTEMPTS}).')
+    parser.add_argument('--stats-file', type=str, default=None,
+                        help='Write per-endpoint request, retry and wait-time counters to this JSON file.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only fetch days after the last point in the local store and append them.')
+    parser.add_argument('--backfill', action='store_true',
+                        help='With --incremental, refetch the full history back to 2021-01-01 into the store.')
+    parser.add_argument('--store-file', type=str, default=STORE_FILE,
+                        help=f'Local point store for incremental runs (default: {STORE_FILE}).')
+    parser.add_argument('--fixed-windows', action='store_true',
+                        help=f'Skip the window probe and fetch fixed {WINDOW_DAYS}-day windows.')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f'Series packed into one trend call via id_list/name_list (default: {BATCH_SIZE}).')
+    parser.add_argument('--columnar', action='store_true',
+                        help='Accumulate points in typed per-series arrays and write CSV, or Parquet for a .parquet '
+                             'filename, straight from them.')
+    parser.add_argument('--journal', dest='journal_file', type=str, default=JOURNAL_FILE,
+                        help=f'Checkpoint journal of finished units (default: {JOURNAL_FILE}).')
+    parser.add_argument('--no-journal', dest='journal_file', action='store_const', const=None,
+                        help='Run without checkpointing.')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip units already in the journal and replay their rows into the output.')
+    parser.add_argument('--discover', action='store_true',
+                        help='Build the brand/series list from the Dongchedi menu endpoints instead of brands.json.')
+    parser.add_argument('--catalogue-cache', type=str, default=CATALOGUE_CACHE_FILE,
+                        help=f'Discovered catalogue cache location (default: {CATALOGUE_CACHE_FILE}).')
+    parser.add_argument('--catalogue-ttl', type=float, default=CATALOGUE_TTL,
+                        help=f'Seconds a discovered catalogue stays valid (default: {CATALOGUE_TTL}).')
+    parser.add_argument('--brand', dest='brands', action='append', default=None,
+                        help='Only scrape this brand (id or name); repeatable.')
+    parser.add_argument('--series', action='append', default=None,
+                        help='Only scrape this series (id or name); repeatable.')
+    parser.add_argument('--shard', type=parse_shard, default=None,
+                        help='Only run shard i of N (e.g. 2/4) of the brand × series pairs and write '
+                             'FILENAME.shard-i-of-N.')
+    parser.add_argument('--merge', nargs='+', default=None, metavar='PARTITION',
+                        help='Merge shard outputs into FILENAME, dropping duplicate (brand, model, data_date) points.')
+    parser.add_argument('--rank-type-cache', type=str, default=RANK_TYPE_CACHE_FILE,
+                        help=f'Rank type cache location (default: {RANK_TYPE_CACHE_FILE}).')
+    parser.add_argument('--rank-type-ttl', type=float, default=RANK_TYPE_TTL,
+                        help=f'Seconds a cached rank type stays valid (default: {RANK_TYPE_TTL}).')
+    return parser
+
+
+def run(filename: str, merge=None, **options):
+    if merge:
+        logging.basicConfig(
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            level=logging.INFO,
+            datefmt="%d-%b-%y %H:%M:%S",
+        )
+        merge_partitions(merge, filename)
+        return
 
-def run(filename: str):
-    scraper = Scraper(historical=True)
+    if options.get("shard"):
+        filename = shard_filename(filename, options["shard"])
+    scraper = Scraper(historical=True, **options)
     scraper.start_scraper()
 
+    if scraper.COLUMNS is not None:
+        if len(scraper.COLUMNS) == 0:
+            logging.error("NO DATA SCRAPED. EXITING...")
+            return
+        logging.info("GENERATING FINAL OUTPUT...")
+        scraper.COLUMNS.write(filename)
+        if scraper.JOURNAL is not None:
+            scraper.JOURNAL.discard()
+        return
+
     results = scraper.MASTER_LIST
     if len(results) == 0:
         logging.error("NO DATA SCRAPED. EXITING...")
@@ -221,10 +1273,13 @@ def run(filename: str):
         quoting=csv.QUOTE_ALL,
         index=False,
     )
+    if scraper.JOURNAL is not None:
+        scraper.JOURNAL.discard()
 
 
 if __name__ == "__main__":
-    run(filename=output_filename)  # Change to `False` for recent data only
+    options = vars(get_parser().parse_args())
+    run(filename=options.pop("filename"), **options)  # Change to `False` for recent data only
     logging.info("ALL DONE")
 
 
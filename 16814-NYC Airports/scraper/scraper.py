@@ -1,9 +1,19 @@
 import os
 import time
-from datetime import datetime, timezone
+import json
+import math
+from datetime import datetime, timezone, timedelta
 import logging
 import csv
+import argparse
+import signal
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
 
 # Configuration
@@ -32,6 +42,26 @@ job_name = "Airport Security & Customs Wait Times Scraper"
 # output_filename = "airport_wait_times.csv"
 scrape_datetime = datetime.now(tz=timezone.utc)
 
+# Poller settings
+POLL_INTERVAL = 60  # Seconds between snapshots
+MAX_WORKERS = 6  # One per airport × type endpoint
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 15
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 1  # Seconds before the first retry, doubled for each one after
+HEARTBEAT_INTERVAL = 900  # Seconds before an unchanged value is written again in --changes-only mode
+STORE_DIR = os.path.join("16814-NYC Airports", "wait-time-log")
+# 12 bytes a row: poll time, dictionary codes for the text columns, and the wait in minutes.
+RECORD = np.dtype([
+    ("ts", "<u4"), ("airport", "u1"), ("type", "u1"), ("terminal", "<u2"), ("queue", "<u2"), ("minutes", "<i2"),
+])
+DICTIONARY_COLUMNS = {"airport": "airport", "type": "wait_time_type", "terminal": "terminal", "queue": "wait_time_subtype"}
+MISSING_MINUTES = -1
+# Rolling statistics
+STATS_WINDOWS = {"15m": 15 * 60, "1h": 60 * 60}
+HISTOGRAM_MAX = 240  # Minutes; longer waits count in the top bucket
+FIELDNAMES = ["scrape_datetime", "airport", "wait_time_type", "terminal", "wait_time_subtype", "wait_time_value"]
+
 headers = {
     'Accept': 'application/json, text/plain, */*',
     'Accept-Language': 'en-GB,en-US;q=0.9,en;q=0.8',
@@ -48,64 +78,518 @@ headers = {
 }
 
 def retry_on_failure(func):
+    """Retry a request up to the scraper's MAX_ATTEMPTS, backing off RETRY_BACKOFF, 2x, 4x... seconds."""
     def wrapper(*args, **kwargs):
-        MAX_ATTEMPTS = 3
-        attempts = MAX_ATTEMPTS
-        while attempts > 0:
+        scraper, url = args[0], args[1]
+        MAX_ATTEMPTS = scraper.MAX_ATTEMPTS
+        for attempt in range(1, MAX_ATTEMPTS + 1):
             try:
                 response = func(*args, **kwargs)
-                if response.status_code == 200:
+                if response.status_code in (200, 304):
                     return response
-                else:
-                    logging.error(f"Request failed. Retrying {MAX_ATTEMPTS - attempts + 1}/{MAX_ATTEMPTS} attempts.")
-                    attempts -= 1
-                    time.sleep(10)
+                logging.error(f"Request to {url} failed with status {response.status_code}. Attempt {attempt}/{MAX_ATTEMPTS}.")
             except Exception as e:
-                logging.error(f"An error occurred - Exception: {e}. Retrying {MAX_ATTEMPTS - attempts + 1}/{MAX_ATTEMPTS} attempts.")
-                attempts -= 1
-                time.sleep(10)
-        logging.warning(f"All attempts failed. Unable to make successful request.")
+                logging.error(f"An error occurred for {url} - Exception: {e}. Attempt {attempt}/{MAX_ATTEMPTS}.")
+            if attempt < MAX_ATTEMPTS:
+                time.sleep(scraper.RETRY_BACKOFF * 2 ** (attempt - 1))
+        logging.warning(f"All attempts failed. Unable to make successful request to {url}.")
         return None
     return wrapper
 
+class ChangeFilter:
+    """Pass a row only when its value differs from the last one written for its
+    (airport, type, terminal, queueType) key, or as a heartbeat once `heartbeat`
+    seconds have gone by since that key was last written."""
+
+    def __init__(self, heartbeat=HEARTBEAT_INTERVAL):
+        self.HEARTBEAT = heartbeat
+        self.LAST = {}
+
+    def filter(self, rows):
+        now = time.monotonic()
+        emitted = []
+        for row in rows:
+            key = (row["airport"], row["wait_time_type"], row["terminal"], row["wait_time_subtype"])
+            last = self.LAST.get(key)
+            if last is None or last[0] != row["wait_time_value"] or now - last[1] >= self.HEARTBEAT:
+                self.LAST[key] = (row["wait_time_value"], now)
+                emitted.append(row)
+        return emitted
+
+
+class WaitTimeLog:
+    """Append-only binary log of wait-time rows, one file of RECORD structs per UTC day.
+
+    Airport, type, terminal and queue are stored as codes into `dictionary.json`, minutes as
+    int16 (MISSING_MINUTES when the API gave no number) and the poll time as epoch seconds.
+    Rows are only ever appended in time order, so a range query memory-maps the days it
+    spans and binary-searches their timestamps instead of parsing the whole history.
+    """
+
+    def __init__(self, directory=STORE_DIR):
+        self.DIRECTORY = directory
+        self.DICTIONARY_FILE = os.path.join(directory, "dictionary.json")
+        os.makedirs(directory, exist_ok=True)
+        self.DICTIONARY = {column: [] for column in DICTIONARY_COLUMNS}
+        if os.path.exists(self.DICTIONARY_FILE):
+            with open(self.DICTIONARY_FILE, "r", encoding="utf-8") as file:
+                self.DICTIONARY.update(json.load(file))
+        self.CODES = {column: {value: code for code, value in enumerate(values)} for column, values in self.DICTIONARY.items()}
+        self.dirty = False
+
+    def code(self, column, value):
+        codes = self.CODES[column]
+        if value not in codes:
+            codes[value] = len(self.DICTIONARY[column])
+            self.DICTIONARY[column].append(value)
+            self.dirty = True
+        return codes[value]
+
+    @staticmethod
+    def minutes(value):
+        try:
+            return max(-32768, min(32767, int(value)))
+        except (TypeError, ValueError):
+            return MISSING_MINUTES
+
+    def partition(self, moment):
+        return os.path.join(self.DIRECTORY, f"{moment:%Y-%m-%d}.bin")
+
+    def append(self, rows):
+        """Append one tick's rows to its day's file; returns the file written."""
+        moment = rows[0]["scrape_datetime"] if rows else datetime.now(timezone.utc)
+        records = np.empty(len(rows), dtype=RECORD)
+        for i, row in enumerate(rows):
+            records[i] = (
+                int(row["scrape_datetime"].timestamp()),
+                *(self.code(column, str(row[field])) for column, field in DICTIONARY_COLUMNS.items()),
+                self.minutes(row["wait_time_value"]),
+            )
+
+        # New codes are saved before any record that uses them.
+        if self.dirty:
+            with open(self.DICTIONARY_FILE + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(self.DICTIONARY, file, ensure_ascii=False)
+            os.replace(self.DICTIONARY_FILE + ".tmp", self.DICTIONARY_FILE)
+            self.dirty = False
+
+        path = self.partition(moment)
+        with open(path, "ab") as file:
+            # Drop a record torn by an earlier crash, or everything after it would be misaligned.
+            torn = file.tell() % RECORD.itemsize
+            if torn:
+                logging.warning(f"Dropping {torn} bytes of a torn record at the end of {path}")
+                file.truncate(file.tell() - torn)
+                file.seek(0, os.SEEK_END)
+            file.write(records.tobytes())
+        return path
+
+    def query(self, start, end):
+        """Rows polled in [start, end) as a DataFrame in the scraper's CSV schema."""
+        start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+        parts = []
+        day = start.astimezone(timezone.utc).date()
+        while day <= end.astimezone(timezone.utc).date():
+            path = self.partition(day)
+            count = os.path.getsize(path) // RECORD.itemsize if os.path.exists(path) else 0
+            if count:
+                # A torn final write not yet repaired by append() is left out by the shape.
+                records = np.memmap(path, dtype=RECORD, mode="r", shape=(count,))
+                low, high = np.searchsorted(records["ts"], [start_ts, end_ts])
+                parts.append(np.array(records[low:high]))
+            day += timedelta(days=1)
+        return self.decode(np.concatenate(parts) if parts else np.empty(0, dtype=RECORD))
+
+    def decode(self, records):
+        minutes = pd.Series(records["minutes"], dtype="Int16")
+        return pd.DataFrame({
+            "scrape_datetime": pd.to_datetime(records["ts"].astype("int64"), unit="s", utc=True),
+            **{
+                field: pd.Categorical.from_codes(records[column].astype("int64"), self.DICTIONARY[column])
+                for column, field in DICTIONARY_COLUMNS.items()
+            },
+            "wait_time_value": minutes.mask(minutes == MISSING_MINUTES).array,
+        })
+
+
+class RollingWindow:
+    """Samples from the last `seconds` plus a per-minute histogram of them.
+
+    Adding a sample and expiring old ones are amortised O(1); quantiles read the
+    fixed-size histogram instead of sorting the window.
+    """
+
+    def __init__(self, seconds):
+        self.SECONDS = seconds
+        self.samples = deque()
+        self.histogram = [0] * (HISTOGRAM_MAX + 1)
+
+    def add(self, moment, minutes):
+        bucket = min(max(minutes, 0), HISTOGRAM_MAX)
+        self.samples.append((moment, bucket))
+        self.histogram[bucket] += 1
+        self.expire(moment)
+
+    def expire(self, now):
+        while self.samples and self.samples[0][0] <= now - self.SECONDS:
+            _, bucket = self.samples.popleft()
+            self.histogram[bucket] -= 1
+
+    def quantile(self, q):
+        """Nearest-rank quantile in minutes, or None for an empty window."""
+        if not self.samples:
+            return None
+        rank = max(1, math.ceil(q * len(self.samples)))
+        seen = 0
+        for minutes, count in enumerate(self.histogram):
+            seen += count
+            if seen >= rank:
+                return minutes
+
+
+class RollingStats:
+    """Live p50/p90 per (airport, type, terminal, queueType) over STATS_WINDOWS, with threshold alerts.
+
+    Fed one snapshot per tick; each tick only touches the windows of the rows it carries,
+    and the published summary is rebuilt from the histograms, never from history.
+    """
+
+    def __init__(self, windows=STATS_WINDOWS, threshold=None):
+        self.WINDOWS = windows
+        self.THRESHOLD = threshold
+        self.SERIES = {}
+        self.ALERTS = {}
+        self.LATEST = {}
+        self.SERVER = None
+
+    def update(self, rows):
+        for row in rows:
+            try:
+                minutes = int(row["wait_time_value"])
+            except (TypeError, ValueError):
+                continue  # "Unknown" or closed queues carry no wait
+            moment = row["scrape_datetime"].timestamp()
+            key = (row["airport"], row["wait_time_type"], row["terminal"], row["wait_time_subtype"])
+            series = self.SERIES.get(key)
+            if series is None:
+                series = self.SERIES[key] = {"windows": {name: RollingWindow(seconds) for name, seconds in self.WINDOWS.items()}}
+            series["latest"] = minutes
+            series["updated"] = moment
+            for window in series["windows"].values():
+                window.add(moment, minutes)
+            self.check_alert(key, minutes, moment)
+
+    def check_alert(self, key, minutes, moment):
+        if self.THRESHOLD is None:
+            return
+        label = " ".join(key)
+        if minutes > self.THRESHOLD and key not in self.ALERTS:
+            self.ALERTS[key] = moment
+            logging.warning(f"🚨 ALERT {label}: {minutes} min is over the {self.THRESHOLD} min threshold")
+        elif minutes <= self.THRESHOLD and key in self.ALERTS:
+            del self.ALERTS[key]
+            logging.info(f"✅ CLEARED {label}: back to {minutes} min")
+
+    def snapshot(self, now):
+        """JSON-ready summary as of `now` (epoch seconds); also kept as LATEST for the HTTP endpoint."""
+        def isoformat(moment):
+            return datetime.fromtimestamp(moment, timezone.utc).isoformat()
+
+        series = []
+        for (airport, wait_time_type, terminal, queue), entry in self.SERIES.items():
+            windows = {}
+            for name, window in entry["windows"].items():
+                window.expire(now)
+                windows[name] = {"samples": len(window.samples), "p50": window.quantile(0.5), "p90": window.quantile(0.9)}
+            series.append({
+                "airport": airport, "wait_time_type": wait_time_type, "terminal": terminal, "wait_time_subtype": queue,
+                "latest": entry["latest"], "latest_at": isoformat(entry["updated"]), "windows": windows,
+            })
+
+        self.LATEST = {
+            "updated": isoformat(now),
+            "threshold": self.THRESHOLD,
+            "alerts": [
+                {"airport": key[0], "wait_time_type": key[1], "terminal": key[2], "wait_time_subtype": key[3],
+                 "latest": self.SERIES[key]["latest"], "since": isoformat(since)}
+                for key, since in self.ALERTS.items()
+            ],
+            "series": series,
+        }
+        return self.LATEST
+
+    def save(self, path):
+        """Write LATEST atomically, so readers never see a half-written file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(self.LATEST, file, ensure_ascii=False, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve LATEST as JSON on http://host:port/ from a background thread."""
+        stats = self
+
+        class StatsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                body = json.dumps(stats.LATEST, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.SERVER = ThreadingHTTPServer((host, port), StatsHandler)
+        threading.Thread(target=self.SERVER.serve_forever, daemon=True).start()
+        logging.info(f"STATS served on http://{host}:{self.SERVER.server_port}/")
+
+    def close(self):
+        if self.SERVER is not None:
+            self.SERVER.shutdown()
+            self.SERVER.server_close()
+
+
 class Scraper:
-    def __init__(self):
+    def __init__(self, poll=False, interval=POLL_INTERVAL, max_workers=MAX_WORKERS, timeout=READ_TIMEOUT,
+                 max_attempts=MAX_ATTEMPTS, changes_only=False, heartbeat=HEARTBEAT_INTERVAL, store_dir=None,
+                 stats_file=None, stats_port=None, alert_threshold=None):
         self.MASTER_LIST = []
+        self.STATS_FILE = stats_file
+        self.STATS_PORT = stats_port
+        tracked = stats_file or stats_port is not None or alert_threshold is not None
+        self.STATS = RollingStats(threshold=alert_threshold) if tracked else None
+        self.STORE = WaitTimeLog(store_dir) if store_dir else None
+        self.CHANGES = ChangeFilter(heartbeat) if changes_only else None
+        self.VALIDATORS = {}  # url -> ETag / Last-Modified and the body they validate
+        self.MAX_WORKERS = max_workers
+        self.TIMEOUT = (CONNECT_TIMEOUT, timeout)
+        self.MAX_ATTEMPTS = max_attempts
+        self.RETRY_BACKOFF = RETRY_BACKOFF
+        self.POLL = poll
+        self.INTERVAL = interval
+        self.STOP = threading.Event()
+        self.TICK_DATETIME = scrape_datetime
+        # One session for the scraper's lifetime keeps connections to the API warm between polls.
         self.CLIENT = requests.Session()
-        logging.info(f"STARTING SCRAPE... {job_name}")
-        time.sleep(2)
+        self.CLIENT.headers.update(headers)
+        # All six endpoints share one host, so the pool must hold a connection per concurrent request.
+        self.CLIENT.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+        self.setup_logging()
+
+    def setup_logging(self):
+        logging.basicConfig(
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            level=logging.INFO,
+            datefmt="%d-%b-%y %H:%M:%S",
+        )
+        logging.info(f"STARTING SCRAPE... {job_name} | POLL: {self.POLL}")
+        if not self.POLL:
+            time.sleep(2)
 
     @retry_on_failure
     def make_request(self, url):
-        return self.CLIENT.get(url, headers=headers, timeout=60)
-
-    def scrape_data(self, urls, wait_time_type):
-        for airport, url in urls.items():
-            response = self.make_request(url)
-            if response and response.status_code == 200:
-                try:
-                    data = response.json()
-                    for item in data:
-                        self.MASTER_LIST.append({
-                            "scrape_datetime": scrape_datetime,
-                            "airport": airport,
-                            "wait_time_type": wait_time_type,
-                            "terminal": item.get("title", "Unknown"),
-                            "wait_time_subtype": item.get("queueType", "Unknown"),
-                            "wait_time_value": item.get("timeInMinutes", "Unknown")
-                        })
-                except requests.exceptions.JSONDecodeError:
-                    logging.error(f"Invalid JSON response for {wait_time_type} wait times at {airport}")
-            else:
-                logging.error(f"Failed to retrieve {wait_time_type} wait times for {airport}")
+        """GET, made conditional on the last response's ETag/Last-Modified when the API sent them."""
+        conditional = {}
+        cached = self.VALIDATORS.get(url)
+        if cached and cached["etag"]:
+            conditional["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            conditional["If-Modified-Since"] = cached["last_modified"]
+        return self.CLIENT.get(url, headers=conditional, timeout=self.TIMEOUT)
+
+    def fetch_json(self, url):
+        """Decoded body of `url`; a 304 Not Modified reuses the body cached with its validators."""
+        response = self.make_request(url)
+        if not response:
+            return None
+        if response.status_code == 304:
+            cached = self.VALIDATORS.get(url)
+            return cached["data"] if cached else None
+
+        data = response.json()
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.VALIDATORS[url] = {"etag": etag, "last_modified": last_modified, "data": data}
+        return data
+
+    def scrape_data(self, airport, url, wait_time_type):
+        """Rows for one airport × type endpoint, and how long it took including retries.
+
+        Any failure is logged and yields no rows, so one bad endpoint never sinks the snapshot.
+        """
+        started = time.monotonic()
+        rows = []
+        try:
+            data = self.fetch_json(url)
+        except requests.exceptions.JSONDecodeError:
+            logging.error(f"Invalid JSON response for {wait_time_type} wait times at {airport}")
+            return rows, time.monotonic() - started
+        except Exception as e:
+            logging.error(f"Failed to retrieve {wait_time_type} wait times for {airport} - Exception: {e}")
+            return rows, time.monotonic() - started
+
+        if data is not None and not (isinstance(data, list) and all(isinstance(item, dict) for item in data)):
+            logging.error(f"Unexpected response for {wait_time_type} wait times at {airport}: {str(data)[:200]}")
+            return rows, time.monotonic() - started
+
+        if data is not None:
+            for item in data:
+                rows.append({
+                    "scrape_datetime": self.TICK_DATETIME,
+                    "airport": airport,
+                    "wait_time_type": wait_time_type,
+                    "terminal": item.get("title", "Unknown"),
+                    "wait_time_subtype": item.get("queueType", "Unknown"),
+                    "wait_time_value": item.get("timeInMinutes", "Unknown")
+                })
+        else:
+            logging.error(f"Failed to retrieve {wait_time_type} wait times for {airport}")
+        return rows, time.monotonic() - started
 
     def start_scraper(self):
-        self.scrape_data(SECURITY_URLS, "security")
-        self.scrape_data(CUSTOMS_URLS, "customs")
+        """Fetch every airport × type endpoint at once, so a snapshot takes as long as its slowest endpoint."""
+        jobs = [(airport, url, "security") for airport, url in SECURITY_URLS.items()]
+        jobs += [(airport, url, "customs") for airport, url in CUSTOMS_URLS.items()]
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            results = list(executor.map(lambda job: self.scrape_data(*job), jobs))
+        # map() keeps job order, so rows come out security then customs, JFK/LGA/EWR, as before.
+        for rows, _ in results:
+            self.MASTER_LIST.extend(rows)
+
+        slowest, (_, elapsed) = max(zip(jobs, results), key=lambda pair: pair[1][1])
+        logging.info(
+            f"SNAPSHOT: {len(self.MASTER_LIST)} rows in {time.monotonic() - started:.2f}s "
+            f"(slowest: {slowest[0]} {slowest[2]} {elapsed:.2f}s)"
+        )
+
+    def snapshot(self):
+        """One poll of every endpoint; returns the rows, all stamped with the tick's time."""
+        self.MASTER_LIST = []
+        self.TICK_DATETIME = datetime.now(timezone.utc)
+        self.start_scraper()
+        return self.MASTER_LIST
+
+    def poll(self, filename, max_ticks=None):
+        """Snapshot every INTERVAL seconds and append each tick to a daily rolling file (or the
+        binary log with --store-dir) until stopped.
+
+        Ticks are scheduled on a fixed grid from the start, so a slow snapshot shortens the
+        following sleep instead of drifting; ticks missed entirely are skipped.
+        """
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: self.STOP.set())
 
+        if self.STATS is not None and self.STATS_PORT is not None:
+            self.STATS.serve(self.STATS_PORT)
+
+        started = time.monotonic()
+        ticks = 0
+        while not self.STOP.is_set():
+            ticks += 1
+            try:
+                self.tick(filename, ticks)
+            except Exception as e:
+                # One bad tick (a full disk, an unexpected payload) is logged; the poller keeps going.
+                logging.error(f"TICK {ticks} failed - Exception: {e}")
+            if max_ticks is not None and ticks >= max_ticks:
+                break
+
+            elapsed = time.monotonic() - started
+            self.STOP.wait(self.INTERVAL - elapsed % self.INTERVAL)
+        if self.STATS is not None:
+            self.STATS.close()
+        logging.info(f"POLLER STOPPED after {ticks} ticks")
+
+    def tick(self, filename, ticks):
+        """Take one snapshot and append it to the rolling file or binary log."""
+        rows = self.snapshot()
+        if self.STATS is not None:
+            # Statistics see every observation, before change-only filtering.
+            self.STATS.update(rows)
+            self.STATS.snapshot(self.TICK_DATETIME.timestamp())
+            if self.STATS_FILE:
+                self.STATS.save(self.STATS_FILE)
+        if self.CHANGES is not None:
+            rows = self.CHANGES.filter(rows)
+        path = self.STORE.append(rows) if self.STORE is not None else self.append_rows(filename, rows)
+        logging.info(f"TICK {ticks}: {len(rows)} of {len(self.MASTER_LIST)} rows appended to {path}")
+
+    def append_rows(self, filename, rows):
+        """Append rows to the rolling file for the tick's UTC day, writing the header for a new file."""
+        path = rolling_filename(filename, self.TICK_DATETIME)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        new_file = not os.path.exists(path)
+        with open(path, "a", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDNAMES, quotechar='"', quoting=csv.QUOTE_ALL)
+            if new_file:
+                writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+
+def rolling_filename(filename, moment):
+    """`data.csv` → `data-2025-02-25.csv`: one file per UTC day of polling."""
+    stem, extension = os.path.splitext(filename)
+    return f"{stem}-{moment:%Y-%m-%d}{extension}"
+
+
+def parse_time(value):
+    """argparse type for --query bounds: an ISO date or datetime, read as UTC unless it has an offset."""
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Scrape Airport Wait Times Data.')
+    parser.add_argument('filename', type=str, nargs='?', default=output_filename,
+                        help=f'Output filename for scraped data (default: {output_filename}).')
+    parser.add_argument('--poll', action='store_true',
+                        help='Keep running and snapshot every endpoint each interval, appending to FILENAME-YYYY-MM-DD.')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                        help=f'Seconds between polls (default: {POLL_INTERVAL}).')
+    parser.add_argument('--workers', dest='max_workers', type=int, default=MAX_WORKERS,
+                        help=f'Endpoints fetched at once (default: {MAX_WORKERS}; 1 fetches them one by one).')
+    parser.add_argument('--timeout', type=float, default=READ_TIMEOUT,
+                        help=f'Read timeout per request in seconds (default: {READ_TIMEOUT}).')
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS,
+                        help=f'Attempts per endpoint before giving up on it for this snapshot (default: {MAX_ATTEMPTS}).')
+    parser.add_argument('--changes-only', action='store_true',
+                        help='When polling, only write rows whose value changed since it was last written.')
+    parser.add_argument('--heartbeat', type=float, default=HEARTBEAT_INTERVAL,
+                        help=f'With --changes-only, rewrite unchanged values after this many seconds '
+                             f'(default: {HEARTBEAT_INTERVAL}).')
+    parser.add_argument('--store-dir', type=str, default=None,
+                        help=f'When polling, append ticks to the compact binary log in this directory instead of CSV '
+                             f'(e.g. {STORE_DIR}).')
+    parser.add_argument('--query', nargs=2, type=parse_time, default=None, metavar=('START', 'END'),
+                        help='Write rows polled in [START, END) from --store-dir to FILENAME instead of scraping.')
+    parser.add_argument('--stats-file', type=str, default=None,
+                        help='When polling, keep a JSON snapshot of rolling 15m/1h p50/p90 per queue at this path.')
+    parser.add_argument('--stats-port', type=int, default=None,
+                        help='When polling, serve the rolling statistics as JSON on http://127.0.0.1:PORT/.')
+    parser.add_argument('--alert-threshold', type=int, default=None,
+                        help='Log an alert when a queue\'s wait goes over this many minutes, and list it in the statistics.')
+    parser.add_argument('--max-ticks', type=int, default=None,
+                        help='Stop the poller after this many snapshots (default: run until interrupted).')
+    return parser
+
+
+def run(filename: str, poll=False, interval=POLL_INTERVAL, max_ticks=None, query=None, **options):
+    if query:
+        df = WaitTimeLog(options.get("store_dir") or STORE_DIR).query(*query)
+        df.to_csv(filename, encoding="utf-8", quotechar='"', quoting=csv.QUOTE_ALL, index=False)
+        print(f"{len(df)} rows written to {filename}")
+        return
+
+    scraper = Scraper(poll=poll, interval=interval, **options)
+    if poll:
+        scraper.poll(filename, max_ticks=max_ticks)
+        return
 
-def run(filename: str):
-    scraper = Scraper()
     scraper.start_scraper()
     results = scraper.MASTER_LIST
     if len(results) < 1:
@@ -116,5 +600,6 @@ def run(filename: str):
     df.to_csv(filename, encoding="utf-8", quotechar='"', quoting=csv.QUOTE_ALL, index=False)
 
 if __name__ == "__main__":
-    run(filename=output_filename)
+    options = vars(get_parser().parse_args())
+    run(filename=options.pop("filename"), **options)
     logging.info("ALL DONE")